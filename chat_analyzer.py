@@ -4,17 +4,30 @@
 """
 
 import time
-from typing import List, Dict, Any
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Tuple, Set
 from tqdm import tqdm
 from data_manager import DataManager
 from llm_client import OptimizedClaudeClient
+from rate_limiter import RateLimiter
+from prefilter import BlockPrefilter
+
+
+def _clip(text: str, limit: int = 100) -> str:
+    """미리보기용으로 긴 메시지를 limit 글자에서 자르고 '...' 표시"""
+    return text if len(text) <= limit else text[:limit] + "..."
 
 
 class ChatAnalyzer:
     """채팅 데이터 분석 클래스"""
     
     def __init__(self, model: str = "claude-3-haiku-20240307", 
-                 max_workers: int = 3, enable_cache: bool = True):
+                 max_workers: int = 3, enable_cache: bool = True,
+                 rpm_limit: int = RateLimiter.DEFAULT_RPM,
+                 tpm_limit: int = RateLimiter.DEFAULT_TPM,
+                 prefilter_cutoff: float = None,
+                 blocks_per_request: int = 1):
         """
         채팅 분석기 초기화
         
@@ -22,22 +35,42 @@ class ChatAnalyzer:
             model: 사용할 Claude 모델명
             max_workers: 병렬 처리 워커 수 (기본값: 5)
             enable_cache: 캐싱 활성화 여부 (기본값: True)
+            rpm_limit: 분당 최대 요청 수 (기본값: 50)
+            tpm_limit: 분당 최대 토큰 수 (기본값: 80,000)
+            prefilter_cutoff: 사전 필터 유사도 기준 (0~1, 미만인 블록은 API 호출 없이 0점 처리, None이면 비활성화)
+            blocks_per_request: 한 번의 API 요청에 묶어 보낼 블록 수 (기본값: 1)
         """
         self.data_manager = DataManager()
-        self.claude_client = OptimizedClaudeClient(
-            model=model, 
-            max_workers=max_workers, 
-            enable_cache=enable_cache
-        )
+        # Claude 클라이언트는 API 키가 필요하므로 처음 사용할 때 생성 (결과 조회만 할 때는 만들지 않음)
+        self._claude_client = None
+        self._client_options = {
+            "model": model,
+            "max_workers": max_workers,
+            "enable_cache": enable_cache
+        }
         self.analysis_results = []
+        self._results_by_id = {}
+        self._match_rates = np.empty(0, dtype=np.float64)
         
         # 성능 설정
         self.max_workers = max_workers
         self.enable_cache = enable_cache
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.prefilter_cutoff = prefilter_cutoff
+        self.blocks_per_request = blocks_per_request
+    
+    @property
+    def claude_client(self) -> OptimizedClaudeClient:
+        """Claude 클라이언트 (첫 접근 시 생성)"""
+        if self._claude_client is None:
+            self._claude_client = OptimizedClaudeClient(**self._client_options)
+        return self._claude_client
     
     def analyze_csv_file(self, csv_path: str, filter_criteria: str, 
                         window_size: int = 100, overlap: int = 50,
-                        fast_mode: bool = True, recent_days: int = None) -> List[Dict[str, Any]]:
+                        fast_mode: bool = True, recent_days: int = None,
+                        auto_proceed: bool = False, max_cost_usd: float = 1.0) -> List[Dict[str, Any]]:
         """
         최적화된 CSV 파일 분석
         
@@ -48,104 +81,273 @@ class ChatAnalyzer:
             overlap: 겹치는 메시지 수
             fast_mode: 고속 모드 (더 작은 샘플링과 병렬 처리)
             recent_days: 최근 N일 이내 데이터만 분석 (None이면 전체)
+            auto_proceed: True면 예상 비용과 관계없이 확인 없이 바로 분석
+            max_cost_usd: 예상 비용이 이 금액(USD) 이하면 확인 없이 바로 분석
+        
+        Returns:
+            분석 결과 리스트
+        """
+        prepared = self._prepare_analysis(csv_path, filter_criteria, window_size, overlap,
+                                          fast_mode, recent_days, auto_proceed=auto_proceed,
+                                          max_cost_usd=max_cost_usd)
+        if not prepared:
+            return []
+        windows, estimated_cost, skipped = prepared
+        
+        # 5. 병렬 분석 실행
+        print(f"🤖 병렬 분석 시작 ({self.max_workers}개 워커)...")
+        
+        # 진행률 표시를 위한 tqdm 설정
+        # 완료가 몰려도 터미널 출력은 0.2초에 한 번만 (이벤트 루프 지연 방지)
+        progress_bar = tqdm(total=len(windows), desc="분석 진행", mininterval=0.2,
+                          bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} '
+                                   '[⏱️{elapsed}<⏲️{remaining}, 🚀{rate_fmt}, 💰${postfix}]')
+        
+        client = self.claude_client
+        
+        def progress_callback(completed, total, latest_score):
+            # update()는 mininterval이 지났을 때만 다시 그림 (매 완료마다 refresh하지 않음)
+            progress_bar.set_postfix_str(f"{client.total_cost:.4f}", refresh=False)
+            progress_bar.update(completed - progress_bar.n)
+        
+        # 중단된 이전 실행이 있으면 완료된 블록부터 이어서 진행
+        checkpoint_path = self.data_manager.get_checkpoint_path(
+            csv_path, filter_criteria, window_size, overlap, recent_days, client.model
+        )
+        
+        # 병렬 분석 실행 (asyncio 이벤트 루프)
+        start_time = time.time()
+        estimated_tokens = estimated_cost['avg_input_tokens_per_block'] + estimated_cost['output_tokens_per_block']
+        parallel_results = asyncio.run(
+            self._analyze_async(windows, filter_criteria, progress_callback, estimated_tokens,
+                                checkpoint_path, skipped)
+        )
+        progress_bar.close()
+        
+        # 모든 블록이 완료되었으면 체크포인트 정리 (실패한 블록이 있으면 다시 실행할 때 그 블록만 분석)
+        failed_count = sum(1 for _, cost_info in parallel_results if cost_info.get('failed'))
+        if failed_count:
+            print(f"⚠️ {failed_count:,}개 블록 분석 실패 - 다시 실행하면 실패한 블록만 분석합니다.")
+        else:
+            self.data_manager.remove_checkpoint(checkpoint_path)
+        
+        # 6. 결과 정리
+        results = self._build_results(windows, parallel_results, filter_criteria)
+        self._set_results(results)
+        
+        # 7. 최종 통계 및 성능 출력
+        total_time = time.time() - start_time
+        self._print_analysis_summary(results)
+        self.claude_client.print_performance_summary()
+        
+        # 8. 비용 예상치 vs 실제 비교
+        self._print_estimate_comparison(estimated_cost, total_time)
+        
+        print(f"\n⚡ 성능 향상 효과")
+        print("=" * 40)
+        sequential_time = len(windows) * 2.0  # 순차 처리 예상 시간
+        speedup = sequential_time / total_time if total_time > 0 else 1
+        print(f"실제 처리시간: {total_time:.1f}초")
+        print(f"순차 처리 예상: {sequential_time:.1f}초")
+        print(f"속도 향상: {speedup:.1f}x")
+        print("=" * 40)
+        
+        return results
+    
+    def analyze_csv_file_batch(self, csv_path: str, filter_criteria: str,
+                              window_size: int = 100, overlap: int = 50,
+                              fast_mode: bool = True, recent_days: int = None,
+                              poll_interval: float = 30.0, auto_proceed: bool = False,
+                              max_cost_usd: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        Message Batches API로 CSV 파일 분석 (50% 비용 할인, 결과는 비동기로 처리되어 최대 24시간 소요)
+        
+        Args:
+            csv_path: CSV 파일 경로
+            filter_criteria: 필터 조건
+            window_size: 윈도우 크기
+            overlap: 겹치는 메시지 수
+            fast_mode: 고속 모드 (대용량 데이터 경고)
+            recent_days: 최근 N일 이내 데이터만 분석 (None이면 전체)
+            poll_interval: 배치 상태 확인 간격 (초)
+            auto_proceed: True면 예상 비용과 관계없이 확인 없이 바로 제출
+            max_cost_usd: 예상 비용이 이 금액(USD) 이하면 확인 없이 바로 제출
         
         Returns:
             분석 결과 리스트
         """
+        prepared = self._prepare_analysis(csv_path, filter_criteria, window_size, overlap,
+                                          fast_mode, recent_days, batch_mode=True,
+                                          auto_proceed=auto_proceed, max_cost_usd=max_cost_usd)
+        if not prepared:
+            return []
+        windows, estimated_cost, skipped = prepared
+        submit_indices = [i for i in range(len(windows)) if i not in skipped]
+        
+        # 5. 배치 제출 및 완료 대기
+        print(f"📦 배치 분석 시작 ({len(submit_indices):,}개 요청을 한 번에 제출)...")
+        
+        progress_bar = tqdm(total=len(submit_indices), desc="배치 처리", mininterval=0.2)
+        
+        def progress_callback(completed, total, latest_score):
+            # update()는 mininterval 단위로만 다시 그림 (매 호출 refresh 방지)
+            progress_bar.update(completed - progress_bar.n)
+        
+        start_time = time.time()
+        # 블록 텍스트는 제출 요청을 만드는 시점에 하나씩 생성
+        chat_texts = (self.data_manager.render_window(*windows[i]) for i in submit_indices)
+        submitted_results = self.claude_client.batch_analyze_message_batch(
+            chat_texts, filter_criteria, poll_interval, progress_callback
+        )
+        progress_bar.close()
+        
+        # 사전 필터링된 블록을 포함해 원래 블록 순서로 복원
+        batch_results = [self._prefiltered_result()] * len(windows)
+        for index, result in zip(submit_indices, submitted_results):
+            batch_results[index] = result
+        
+        # 6. 결과 정리
+        results = self._build_results(windows, batch_results, filter_criteria)
+        self._set_results(results)
+        
+        # 7. 최종 통계 및 비용 출력
+        total_time = time.time() - start_time
+        self._print_analysis_summary(results)
+        self.claude_client.print_performance_summary()
+        self._print_estimate_comparison(estimated_cost, total_time)
+        
+        return results
+    
+    def _prepare_analysis(self, csv_path: str, filter_criteria: str, window_size: int, overlap: int,
+                          fast_mode: bool, recent_days: int, batch_mode: bool = False,
+                          auto_proceed: bool = False, max_cost_usd: float = 1.0):
+        """
+        분석 준비: CSV 로드, 윈도우 분할, 비용 추정, 사용자 확인 (저비용/자동 진행 시 생략)
+        
+        Returns:
+            (윈도우 구간 리스트, 비용 추정치, 사전 필터링된 블록 인덱스 집합) 튜플, 실패/취소 시 None
+        """
         print(f"🚀 채팅 데이터 분석 시작")
         print(f"📁 파일: {csv_path}")
         print(f"🔍 필터: {filter_criteria}")
         print(f"📊 윈도우: {window_size}, 겹침: {overlap}")
         if recent_days:
             print(f"📅 기간: 최근 {recent_days}일")
-        print(f"⚡ 고속모드: {'활성화' if fast_mode else '비활성화'}")
-        print(f"🔧 병렬워커: {self.max_workers}개")
+        if batch_mode:
+            print(f"📦 배치 API: 활성화 (50% 할인)")
+        else:
+            print(f"⚡ 고속모드: {'활성화' if fast_mode else '비활성화'}")
+            print(f"🔧 병렬워커: {self.max_workers}개")
+            if self.blocks_per_request > 1:
+                print(f"📚 요청당 블록: {self.blocks_per_request}개")
         print(f"💾 캐싱: {'활성화' if self.enable_cache else '비활성화'}")
+        if self.prefilter_cutoff is not None:
+            print(f"🧹 사전 필터: 유사도 {self.prefilter_cutoff} 미만 블록 제외")
         print("-" * 60)
         
         # 1. CSV 파일 로드
-        chat_data = self.data_manager.load_csv(csv_path, recent_days)
-        if not chat_data:
+        _, _, messages = self.data_manager.load_csv(csv_path, recent_days)
+        if not messages:
             print("❌ CSV 파일 로드 실패")
-            return []
+            return None
         
         # 2. 슬라이딩 윈도우로 분할
-        self.data_manager.chat_data = chat_data  # 업데이트된 데이터 설정
-        chat_blocks = self.data_manager.create_sliding_windows(window_size, overlap)
-        if not chat_blocks:
+        windows = self.data_manager.create_sliding_windows(window_size, overlap)
+        if not windows:
             print("❌ 채팅 블록 생성 실패")
-            return []
+            return None
+        
+        # 3. 필터 조건과 무관한 블록 사전 제외 (선택)
+        skipped = set()
+        if self.prefilter_cutoff is not None:
+            skipped = self._prefilter_windows(windows, filter_criteria)
         
-        # 3. 비용 예상치 및 시간 예상치 출력
-        estimated_cost = self._estimate_cost_and_time(chat_blocks, filter_criteria)
+        # 4. 비용 예상치 및 시간 예상치 출력 (API로 보낼 블록 기준)
+        submit_windows = [window for i, window in enumerate(windows) if i not in skipped]
+        estimated_cost = self._estimate_cost_and_time(submit_windows, filter_criteria, batch_mode)
         print(f"💰 예상 비용: ${estimated_cost['total_usd']:.4f} (₩{estimated_cost['total_krw']:.0f})")
-        print(f"⏱️ 예상 시간: {estimated_cost['estimated_time']:.1f}초")
-        print(f"📊 처리 블록: {len(chat_blocks):,}개")
+        if not batch_mode:
+            print(f"⏱️ 예상 시간: {estimated_cost['estimated_time']:.1f}초")
+        print(f"📊 처리 블록: {len(submit_windows):,}개")
         
-        # 4. 대용량 데이터 추가 경고 (비용 확인 후)
-        if fast_mode and len(chat_data) > 50000:
-            print(f"\n⚠️  대용량 데이터 분석: {len(chat_data):,}개 메시지")
+        # 5. 대용량 데이터 추가 경고 (비용 확인 후)
+        if fast_mode and len(messages) > 50000:
+            print(f"\n⚠️  대용량 데이터 분석: {len(messages):,}개 메시지")
             print(f"💡 완료까지 시간이 걸릴 수 있습니다.")
         
-        proceed = input("\n분석을 시작하시겠습니까? (y/N): ").lower().strip()
-        if proceed != 'y':
-            print("분석이 취소되었습니다.")
-            return []
-        
-        # 5. 병렬 분석 실행
-        print(f"🤖 병렬 분석 시작 ({self.max_workers}개 워커)...")
-        
-        # 진행률 표시를 위한 tqdm 설정
-        progress_bar = tqdm(total=len(chat_blocks), desc="분석 진행", 
-                          bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} '
-                                   '[⏱️{elapsed}<⏲️{remaining}, 🚀{rate_fmt}, 💰${postfix}]')
-        
-        def progress_callback(completed, total, latest_score):
-            current_cost = self.claude_client.total_cost
-            progress_bar.set_postfix_str(f"{current_cost:.4f}")
-            progress_bar.n = completed
-            progress_bar.refresh()
+        # 자동 진행이거나 예상 비용이 상한 이하면 확인 없이 바로 시작 (스크립트/cron 실행용)
+        if auto_proceed:
+            print("\n✅ 자동 진행: 확인 없이 분석을 시작합니다.")
+        elif estimated_cost['total_usd'] <= max_cost_usd:
+            print(f"\n✅ 예상 비용이 ${max_cost_usd:.2f} 이하이므로 확인 없이 분석을 시작합니다.")
+        else:
+            proceed = input("\n분석을 시작하시겠습니까? (y/N): ").lower().strip()
+            if proceed != 'y':
+                print("분석이 취소되었습니다.")
+                return None
         
-        # 병렬 분석 실행
-        start_time = time.time()
-        parallel_results = self.claude_client.batch_analyze_parallel(
-            chat_blocks, filter_criteria, progress_callback
-        )
-        progress_bar.close()
+        return windows, estimated_cost, skipped
+    
+    def _prefilter_windows(self, windows: List[Tuple[int, int]], filter_criteria: str) -> Set[int]:
+        """필터 조건과의 문자 n-gram 유사도가 기준 미만인 블록 인덱스 집합 반환"""
+        texts = [self.data_manager.render_window(start, end) for start, end in windows]
+        sims = BlockPrefilter().similarities(filter_criteria, texts)
+        skipped = set(np.flatnonzero(sims < self.prefilter_cutoff).tolist())
+        max_sim = float(sims.max()) if sims.size else 0.0
+        
+        print(f"🧹 사전 필터: {len(skipped):,}/{len(windows):,}개 블록 제외 "
+              f"(유사도 중앙값 {float(np.median(sims)) if sims.size else 0.0:.3f}, 최댓값 {max_sim:.3f})")
+        
+        # 기준을 넘는 블록이 하나도 없으면 조건 표현이 본문과 겹치지 않거나 기준이 너무 높은 것이므로 전체를 분석
+        if windows and len(skipped) == len(windows):
+            print(f"⚠️ 사전 필터 기준({self.prefilter_cutoff}) 이상인 블록이 없어 사전 필터를 적용하지 않습니다 "
+                  f"(조건 단어가 채팅 본문에 나오지 않으면 유사도가 0에 가깝습니다, --prefilter-cutoff를 낮춰보세요)")
+            return set()
+        return skipped
+    
+    def _prefiltered_result(self) -> Tuple[float, Dict[str, Any]]:
+        """사전 필터링으로 API 호출 없이 0점 처리한 블록의 결과"""
+        return 0.0, {**self.claude_client._calculate_cost(0, 0), "summary": "사전 필터링됨", "prefiltered": True}
+    
+    def _build_results(self, windows: List[Tuple[int, int]],
+                       block_results: List[Tuple[float, Dict[str, Any]]],
+                       filter_criteria: str) -> List[Dict[str, Any]]:
+        """블록별 (매칭률, 비용정보)를 저장/검색용 결과 딕셔너리로 변환"""
+        # 루프 안에서 반복되는 속성/메서드 조회를 지역 변수로 고정
+        dates = self.data_manager.dates
+        users = self.data_manager.users
+        messages = self.data_manager.messages
         
-        # 6. 결과 정리
         results = []
-        for i, (match_rate, cost_info) in enumerate(parallel_results):
-            result = {
-                "block_id": i + 1,
-                "start_index": i * (window_size - overlap),
-                "end_index": min(i * (window_size - overlap) + window_size, len(chat_data)),
-                "message_count": len(chat_blocks[i]),
+        append = results.append
+        clip = _clip
+        for block_id, ((start, end), (match_rate, cost_info)) in enumerate(zip(windows, block_results), 1):
+            last = end - 1
+            append({
+                "block_id": block_id,
+                "start_index": start,
+                "end_index": end,
+                "message_count": end - start,
                 "match_rate": match_rate,
                 "summary": cost_info.get('summary', '분석 요약 없음'),
                 "filter_criteria": filter_criteria,
                 "cost_info": cost_info,
                 "first_message": {
-                    "date": chat_blocks[i][0]['date'],
-                    "user": chat_blocks[i][0]['user'],
-                    "message": chat_blocks[i][0]['message'][:100] + "..." if len(chat_blocks[i][0]['message']) > 100 else chat_blocks[i][0]['message']
+                    "date": dates[start],
+                    "user": users[start],
+                    "message": clip(messages[start])
                 },
                 "last_message": {
-                    "date": chat_blocks[i][-1]['date'],
-                    "user": chat_blocks[i][-1]['user'],
-                    "message": chat_blocks[i][-1]['message'][:100] + "..." if len(chat_blocks[i][-1]['message']) > 100 else chat_blocks[i][-1]['message']
+                    "date": dates[last],
+                    "user": users[last],
+                    "message": clip(messages[last])
                 }
-            }
-            results.append(result)
-        
-        self.analysis_results = results
-        
-        # 7. 최종 통계 및 성능 출력
-        total_time = time.time() - start_time
-        self._print_analysis_summary(results)
-        self.claude_client.print_performance_summary()
+            })
         
-        # 8. 비용 예상치 vs 실제 비교
+        return results
+    
+    def _print_estimate_comparison(self, estimated_cost: Dict[str, Any], total_time: float):
+        """비용 예상치 vs 실제 사용량 비교 출력"""
         actual_usage = self.claude_client.get_performance_summary()
         print(f"\n📊 예상 vs 실제 비교")
         print("=" * 40)
@@ -161,15 +363,87 @@ class ChatAnalyzer:
         print(f"예상 비용: ${estimated_cost['total_usd']:.4f}")
         print(f"실제 비용: ${actual_usage['total_cost_usd']:.4f}")
         print("=" * 40)
+    
+    async def _analyze_async(self, windows: List[Tuple[int, int]], filter_criteria: str,
+                             progress_callback=None, estimated_tokens: int = 0,
+                             checkpoint_path: str = None,
+                             skipped: Set[int] = frozenset()) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        asyncio 기반 병렬 분석 (세마포어로 동시 요청 수 제한, RPM/TPM 레이트 리미트 적용)
         
-        print(f"\n⚡ 성능 향상 효과")
-        print("=" * 40)
-        sequential_time = len(chat_blocks) * 2.0  # 순차 처리 예상 시간
-        speedup = sequential_time / total_time if total_time > 0 else 1
-        print(f"실제 처리시간: {total_time:.1f}초")
-        print(f"순차 처리 예상: {sequential_time:.1f}초")
-        print(f"속도 향상: {speedup:.1f}x")
-        print("=" * 40)
+        Args:
+            windows: 채팅 블록들의 (시작, 끝) 인덱스 리스트
+            filter_criteria: 필터 조건
+            progress_callback: 진행상황 콜백 함수
+            estimated_tokens: 블록당 예상 토큰 수 (TPM 계산용)
+            checkpoint_path: 완료된 블록을 즉시 기록할 JSONL 파일 (None이면 기록 안 함)
+            skipped: 사전 필터링되어 API 호출 없이 0점 처리할 블록 인덱스
+        
+        Returns:
+            블록 순서대로 정렬된 (매칭률, 비용정보) 튜플들의 리스트
+        """
+        client = self.claude_client
+        client.start_time = time.time()
+        rate_limiter = RateLimiter(rpm=self.rpm_limit, tpm=self.tpm_limit, 
+                                   max_concurrency=self.max_workers)
+        results = [None] * len(windows)
+        
+        # 블록 텍스트는 중복 확인/전송 시점에만 생성 (처리 중인 블록만 메모리에 유지)
+        def chat_text_of(index: int) -> str:
+            return self.data_manager.render_window(*windows[index])
+        
+        def content_key(index: int) -> str:
+            return client._generate_cache_key(chat_text_of(index), filter_criteria)
+        
+        # 이전 실행에서 이미 완료된 블록은 제출하지 않음 (내용 키가 같은 블록만 이어받음)
+        completed = 0
+        saved = self.data_manager.load_checkpoint(checkpoint_path) if checkpoint_path else {}
+        if saved:
+            restored = set()
+            for index in range(len(windows)):
+                if index in skipped:
+                    continue
+                key = content_key(index)
+                result = saved.get(key)
+                if result is None:
+                    continue
+                # 같은 내용의 두 번째 블록부터는 비용 0인 중복 결과로 복원
+                results[index] = result if key not in restored else client._reused_result(result, "duplicate")
+                restored.add(key)
+                completed += 1
+            if completed:
+                print(f"♻️ 이전 실행에서 완료된 {completed:,}개 블록을 이어서 사용합니다.")
+        
+        for index in skipped:
+            if results[index] is None:
+                results[index] = self._prefiltered_result()
+                completed += 1
+        
+        # 내용이 같은 블록은 대표 블록 하나만 분석하고 결과를 공유 (중복 제거/묶음/동시성 제한은 클라이언트 공용)
+        remaining = [i for i, result in enumerate(results) if result is None]
+        analyzed = client._aanalyze_blocks(chat_text_of, remaining, filter_criteria, rate_limiter,
+                                           estimated_tokens, self.blocks_per_request)
+        
+        total = len(windows)
+        checkpoint = self.data_manager.open_checkpoint(checkpoint_path) if checkpoint_path else None
+        try:
+            async for block_results in analyzed:
+                for block_index, block_result in block_results:
+                    results[block_index] = block_result
+                    completed += 1
+                    
+                    # 완료 즉시 기록하여 중단되어도 다시 비용을 지불하지 않도록 함
+                    # 실패한 블록은 기록하지 않아 다음 실행에서 다시 분석하고,
+                    # 중복 블록은 대표 블록과 내용 키가 같으므로 따로 기록하지 않음
+                    cost_info = block_result[1]
+                    if checkpoint and not cost_info.get('failed') and not cost_info.get('duplicate'):
+                        self.data_manager.append_checkpoint(checkpoint, content_key(block_index), block_result)
+                
+                if progress_callback:
+                    progress_callback(completed, total, block_results[-1][1][0])
+        finally:
+            if checkpoint:
+                checkpoint.close()
         
         return results
     
@@ -189,16 +463,27 @@ class ChatAnalyzer:
     def load_results(self, file_path: str) -> List[Dict[str, Any]]:
         """저장된 분석 결과 로드"""
         results = self.data_manager.load_analysis_results(file_path)
-        self.analysis_results = results
+        self._set_results(results)
         return results
     
+    def _set_results(self, results: List[Dict[str, Any]]):
+        """분석 결과 설정 및 block_id 인덱스/매칭률 배열 갱신"""
+        self.analysis_results = results
+        self._results_by_id = {result['block_id']: result for result in results}
+        # 통계/임계값 검색용 매칭률 컬럼 (결과 리스트와 같은 순서)
+        self._match_rates = np.fromiter((result.get('match_rate', 0) for result in results),
+                                        dtype=np.float64, count=len(results))
+    
     def get_blocks_above_threshold(self, threshold: float) -> List[Dict[str, Any]]:
         """임계값 이상의 블록들 반환"""
         if not self.analysis_results:
             print("❌ 분석 결과가 없습니다.")
             return []
         
-        filtered_blocks = self.data_manager.filter_by_threshold(self.analysis_results, threshold)
+        # 매칭률 배열의 불리언 마스크로 한 번에 선택
+        indices = np.flatnonzero(self._match_rates >= threshold)
+        filtered_blocks = [self.analysis_results[i] for i in indices.tolist()]
+        print(f"✅ 임계값 {threshold}% 이상 블록: {len(filtered_blocks)}개")
         
         print(f"\n📋 매칭률 {threshold}% 이상인 블록들:")
         print("-" * 50)
@@ -214,12 +499,14 @@ class ChatAnalyzer:
         
         return filtered_blocks
     
-    def _estimate_cost_and_time(self, chat_blocks: List[List[Dict[str, str]]], 
-                               filter_criteria: str) -> Dict[str, Any]:
-        """비용 및 시간 추정 (개선된 토큰 계산)"""
+    def _estimate_cost_and_time(self, windows: List[Tuple[int, int]], 
+                               filter_criteria: str, batch_mode: bool = False) -> Dict[str, Any]:
+        """비용 및 시간 추정 (개선된 토큰 계산, batch_mode면 배치 API 할인 적용)"""
+        # 토큰 추정은 NumPy/Numba를 쓰므로 비용 추정을 실제로 할 때 불러옴
+        from token_estimator import estimate_prompt_tokens
         
         # 성능과 정확도의 균형을 위한 적응형 샘플링
-        total_blocks = len(chat_blocks)
+        total_blocks = len(windows)
         if total_blocks <= 10:
             # 적은 블록 수면 모든 블록 분석
             sample_size = total_blocks
@@ -236,18 +523,10 @@ class ChatAnalyzer:
         total_sample_tokens = 0
         
         for i in range(sample_size):
-            sample_block = chat_blocks[i]
-            sample_text = self.claude_client._format_chat_messages(sample_block)
+            sample_text = self.data_manager.render_window(*windows[i])
             sample_prompt = self.claude_client._create_optimized_prompt(sample_text, filter_criteria)
             
-            # 더 정확한 토큰 추정 (한국어와 영어 혼재 고려)
-            # 한국어: 글자당 1.5토큰, 영어: 단어당 1.3토큰, 공백/기호: 0.5토큰
-            korean_chars = sum(1 for char in sample_prompt if '\uac00' <= char <= '\ud7af')
-            english_words = len([word for word in sample_prompt.split() if word.isascii() and word.isalpha()])
-            other_chars = len(sample_prompt) - korean_chars - sum(len(word) for word in sample_prompt.split() if word.isascii() and word.isalpha())
-            
-            estimated_tokens = int(korean_chars * 1.5 + english_words * 1.3 + other_chars * 0.5)
-            total_sample_tokens += estimated_tokens
+            total_sample_tokens += estimate_prompt_tokens(sample_prompt)
         
         # 평균 토큰 수 계산
         avg_input_tokens_per_block = total_sample_tokens // sample_size if sample_size > 0 else 500
@@ -262,6 +541,8 @@ class ChatAnalyzer:
             input_cost = (total_input_tokens / 1000) * pricing["input"]
             output_cost = (total_output_tokens / 1000) * pricing["output"]
             total_cost_usd = input_cost + output_cost
+            if batch_mode:
+                total_cost_usd *= self.claude_client.BATCH_DISCOUNT
         else:
             total_cost_usd = 0.0
         
@@ -282,6 +563,7 @@ class ChatAnalyzer:
             "total_blocks": total_blocks,
             "estimated_tokens": total_input_tokens + total_output_tokens,
             "avg_input_tokens_per_block": avg_input_tokens_per_block,
+            "output_tokens_per_block": estimated_output_tokens_per_block,
             "total_input_tokens": total_input_tokens,
             "total_output_tokens": total_output_tokens,
             "total_usd": total_cost_usd,
@@ -296,16 +578,16 @@ class ChatAnalyzer:
         if not results:
             return
         
-        stats = self.data_manager.get_statistics(results)
+        match_rates = self._match_rates
         
         print(f"\n📊 분석 결과 요약")
         print("=" * 50)
-        print(f"전체 블록 수: {stats['total_blocks']:,}개")
-        print(f"평균 매칭률: {stats['average_match_rate']:.1f}%")
-        print(f"최고 매칭률: {stats['max_match_rate']:.1f}%")
-        print(f"최저 매칭률: {stats['min_match_rate']:.1f}%")
-        print(f"50% 이상 블록: {stats['blocks_above_50']:,}개")
-        print(f"75% 이상 블록: {stats['blocks_above_75']:,}개")
+        print(f"전체 블록 수: {match_rates.size:,}개")
+        print(f"평균 매칭률: {match_rates.mean():.1f}%")
+        print(f"최고 매칭률: {match_rates.max():.1f}%")
+        print(f"최저 매칭률: {match_rates.min():.1f}%")
+        print(f"50% 이상 블록: {int((match_rates >= 50).sum()):,}개")
+        print(f"75% 이상 블록: {int((match_rates >= 75).sum()):,}개")
         print("=" * 50)
     
     def get_detailed_block_info(self, block_id: int) -> Dict[str, Any]:
@@ -314,12 +596,12 @@ class ChatAnalyzer:
             print("❌ 분석 결과가 없습니다.")
             return {}
         
-        for result in self.analysis_results:
-            if result['block_id'] == block_id:
-                return result
+        result = self._results_by_id.get(block_id)
+        if result is None:
+            print(f"❌ 블록 #{block_id}를 찾을 수 없습니다.")
+            return {}
         
-        print(f"❌ 블록 #{block_id}를 찾을 수 없습니다.")
-        return {}
+        return result
     
     def get_performance_summary(self) -> Dict[str, Any]:
         """성능 요약 반환"""
@@ -3,19 +3,48 @@ CSV 파일 읽기 및 데이터 처리 모듈
 Date,User,Message 형식의 CSV 파일을 처리
 """
 
-import pandas as pd
+import os
 import json
-from typing import List, Dict, Any, Optional
+import mmap
+import warnings
+import hashlib
+import numpy as np
+import pandas as pd
+try:
+    import orjson
+except ImportError:  # orjson 미설치 시 표준 json 사용
+    orjson = None
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:  # pyarrow 미설치 시 pandas 기본 C 엔진으로 CSV 읽기
+    pa = None
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
 
 class DataManager:
     """CSV 데이터 읽기/쓰기 및 처리를 담당하는 클래스"""
     
+    # 분석에 사용하는 CSV 컬럼
+    CHAT_COLUMNS = ['Date', 'User', 'Message']
+    
+    # 결측값으로 읽을 문자열 (pandas read_csv의 기본 na_values와 같음, pyarrow 리더에도 동일하게 적용)
+    NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+    
+    # 분석 중간 결과(체크포인트) 저장 디렉토리
+    CHECKPOINT_DIR = ".checkpoints"
+    
     def __init__(self):
-        self.chat_data = []
+        # 컬럼 단위(SoA) 저장: 메시지마다 dict를 만들지 않고 병렬 리스트로 보관
+        self.dates: List[str] = []
+        self.users: List[str] = []
+        self.messages: List[str] = []
+        # 분석용으로 미리 포맷한 메시지 문자열 ("사용자: 메시지"), 윈도우끼리 공유
+        self._rendered: List[str] = []
     
-    def load_csv(self, file_path: str, recent_days: Optional[int] = None) -> List[Dict[str, str]]:
+    def load_csv(self, file_path: str, recent_days: Optional[int] = None) -> Tuple[List[str], List[str], List[str]]:
         """
         CSV 파일을 읽어서 채팅 데이터로 변환
         
@@ -24,45 +53,92 @@ class DataManager:
             recent_days: 최근 N일 이내 데이터만 로드 (None이면 전체)
         
         Returns:
-            채팅 데이터 리스트 [{"date": "...", "user": "...", "message": "..."}]
+            (날짜 리스트, 사용자 리스트, 메시지 리스트) - 같은 인덱스가 같은 메시지
         """
         try:
-            # CSV 파일 읽기
-            df = pd.read_csv(file_path, encoding='utf-8')
-            
-            # 컬럼명 확인 및 표준화
-            expected_columns = ['Date', 'User', 'Message']
-            if not all(col in df.columns for col in expected_columns):
-                raise ValueError(f"CSV 파일에 필요한 컬럼이 없습니다. 필요한 컬럼: {expected_columns}")
+            # CSV보다 최신인 Parquet 캐시가 있으면 파싱/정리 없이 바로 사용
+            parquet_path = file_path + '.parquet'
+            df = self._read_parquet_cache(file_path, parquet_path)
             
-            # 데이터 정리
-            df = df.dropna(subset=['Message'])  # 메시지가 없는 행 제거
-            df['Message'] = df['Message'].astype(str).str.strip()  # 메시지 공백 제거
-            df = df[df['Message'] != '']  # 빈 메시지 제거
+            if df is None:
+                # 컬럼명 확인 (헤더만 읽음)
+                header = pd.read_csv(file_path, encoding='utf-8', nrows=0).columns
+                if not all(col in header for col in self.CHAT_COLUMNS):
+                    raise ValueError(f"CSV 파일에 필요한 컬럼이 없습니다. 필요한 컬럼: {self.CHAT_COLUMNS}")
+                
+                # CSV 파일 읽기 (필요한 컬럼만)
+                df = self._read_chat_csv(file_path)
+                
+                # 데이터 정리: 공백 제거 후 없는/빈 메시지 행을 한 번의 마스크로 제거
+                messages = df['Message'].str.strip()
+                mask = messages.notna() & (messages.str.len() > 0)
+                df = df.loc[mask].assign(Message=messages[mask])
+                
+                # 다음 실행을 위해 정리된 데이터를 Parquet으로 저장 (기간 필터 적용 전)
+                self._write_parquet_cache(df, parquet_path)
             
             # 날짜 필터링 (recent_days가 지정된 경우)
             if recent_days is not None:
                 df = self._filter_by_recent_days(df, recent_days)
             
-            # 딕셔너리 리스트로 변환
-            chat_data = []
-            for _, row in df.iterrows():
-                chat_data.append({
-                    'date': str(row['Date']).strip(),
-                    'user': str(row['User']).strip(),
-                    'message': str(row['Message']).strip()
-                })
+            # 컬럼별 리스트로 변환 (없는 날짜/사용자는 'nan'으로 표시)
+            # pandas 3의 astype(str)은 결측값을 그대로 두므로 object로 바꿔 직접 채움
+            self.dates = df['Date'].astype(object).fillna('nan').astype(str).str.strip().tolist()
+            self.users = df['User'].astype(object).fillna('nan').astype(str).str.strip().tolist()
+            self.messages = df['Message'].tolist()
+            self._rendered = [f"{user}: {message}" for user, message in zip(self.users, self.messages)]
             
-            self.chat_data = chat_data
             filter_msg = f" (최근 {recent_days}일)" if recent_days else ""
-            print(f"✅ CSV 파일 로드 완료{filter_msg}: {len(chat_data)}개의 메시지")
-            return chat_data
+            print(f"✅ CSV 파일 로드 완료{filter_msg}: {len(self.messages)}개의 메시지")
+            return self.dates, self.users, self.messages
             
         except Exception as e:
             print(f"❌ CSV 파일 로드 중 오류 발생: {e}")
-            return []
+            return [], [], []
+    
+    def _read_chat_csv(self, file_path: str) -> pd.DataFrame:
+        """
+        필요한 컬럼만 읽기 (pyarrow CSV 리더 우선, 미설치 시 기본 C 엔진)
+        
+        Date는 자동 날짜 변환 없이 원본 문자열로, User는 반복이 많으므로 category로 읽음
+        """
+        if pa is None:
+            return pd.read_csv(file_path, encoding='utf-8', usecols=self.CHAT_COLUMNS,
+                               dtype={'Date': str, 'User': 'category', 'Message': str})
+        
+        # pandas의 pyarrow 엔진은 dtype을 파싱 후에 적용하므로 날짜가 Timestamp로 바뀌고
+        # (pandas 2.x에서는 빈 메시지가 'None' 문자열이 됨) 파싱 단계에서 바로 문자열로 읽음
+        # 'nan', 'NA', 빈 칸 등은 C 엔진과 같이 결측값으로 읽어 load_csv의 빈 메시지 마스크에서 제거됨
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=self.CHAT_COLUMNS,
+            column_types={column: pa.string() for column in self.CHAT_COLUMNS},
+            null_values=self.NA_VALUES,
+            strings_can_be_null=True
+        )
+        df = pa_csv.read_csv(file_path, convert_options=convert_options).to_pandas()
+        return df.astype({'User': 'category'})
+    
+    def _read_parquet_cache(self, file_path: str, parquet_path: str) -> Optional[pd.DataFrame]:
+        """CSV보다 최신인 Parquet 캐시 로드 (없거나 읽을 수 없으면 None)"""
+        if not os.path.exists(parquet_path) or os.path.getmtime(parquet_path) < os.path.getmtime(file_path):
+            return None
+        
+        try:
+            return pd.read_parquet(parquet_path, columns=self.CHAT_COLUMNS)
+        except Exception:
+            # pyarrow 미설치 또는 손상된 캐시는 CSV를 다시 읽음
+            return None
     
-    def create_sliding_windows(self, window_size: int = 100, overlap: int = 50) -> List[List[Dict[str, str]]]:
+    def _write_parquet_cache(self, df: pd.DataFrame, parquet_path: str):
+        """정리된 데이터를 Parquet 캐시로 저장 (pyarrow 미설치 시 생략)"""
+        try:
+            df.to_parquet(parquet_path, compression='zstd', index=False)
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Parquet 캐시 저장 실패 (다음 실행에도 CSV를 읽습니다): {e}")
+    
+    def create_sliding_windows(self, window_size: int = 100, overlap: int = 50) -> List[Tuple[int, int]]:
         """
         슬라이딩 윈도우 방식으로 채팅 데이터를 분할
         
@@ -71,26 +147,41 @@ class DataManager:
             overlap: 겹치는 메시지 수 (기본값: 50)
         
         Returns:
-            채팅 블록들의 리스트
+            채팅 블록들의 (시작 인덱스, 끝 인덱스) 리스트 (끝 인덱스는 미포함)
         """
-        if not self.chat_data:
+        if not self.messages:
             print("❌ 로드된 채팅 데이터가 없습니다.")
             return []
         
-        blocks = []
         step = window_size - overlap
+        total = len(self.messages)
         
-        for i in range(0, len(self.chat_data), step):
-            block = self.chat_data[i:i + window_size]
-            if len(block) >= 10:  # 최소 10개 메시지가 있는 블록만 포함
-                blocks.append(block)
-            
-            # 마지막 블록이 윈도우 크기보다 작으면 중단
-            if i + window_size >= len(self.chat_data):
-                break
+        # 마지막 블록 시작점: 끝까지 덮는 첫 시작점 (그 뒤 블록은 만들지 않음)
+        last_start = -(-max(total - window_size, 0) // step) * step
+        
+        # 마지막 블록은 데이터 끝에서 잘림, 최소 10개 메시지가 있는 블록만 포함
+        windows = [(start, min(start + window_size, total))
+                   for start in range(0, last_start + 1, step)]
+        windows = [(start, end) for start, end in windows if end - start >= 10]
         
-        print(f"✅ 슬라이딩 윈도우 생성 완료: {len(blocks)}개의 블록")
-        return blocks
+        print(f"✅ 슬라이딩 윈도우 생성 완료: {len(windows)}개의 블록")
+        return windows
+    
+    def render_window(self, start: int, end: int) -> str:
+        """[start, end) 구간을 분석용 텍스트로 반환 (메시지별 포맷은 로드 시 한 번만 수행)"""
+        return "\n".join(self._rendered[start:end])
+    
+    def get_message(self, index: int) -> Dict[str, str]:
+        """인덱스 위치의 메시지를 딕셔너리로 반환"""
+        return {
+            'date': self.dates[index],
+            'user': self.users[index],
+            'message': self.messages[index]
+        }
+    
+    def get_block(self, start: int, end: int) -> List[Dict[str, str]]:
+        """[start, end) 구간의 메시지들을 딕셔너리 리스트로 반환 (필요한 시점에만 생성)"""
+        return [self.get_message(i) for i in range(start, end)]
     
     def save_analysis_results(self, results: List[Dict[str, Any]], file_path: str = None) -> str:
         """
@@ -113,14 +204,18 @@ class DataManager:
                 "analysis_info": {
                     "timestamp": datetime.now().isoformat(),
                     "total_blocks": len(results),
-                    "total_messages": len(self.chat_data)
+                    "total_messages": len(self.messages)
                 },
                 "results": results
             }
             
             # JSON 파일로 저장
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                with open(file_path, 'wb') as f:
+                    f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(output_data, f, ensure_ascii=False, indent=2)
             
             print(f"✅ 분석 결과 저장 완료: {file_path}")
             return file_path
@@ -140,8 +235,15 @@ class DataManager:
             분석 결과 리스트
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if orjson is not None:
+                # 파일을 메모리 매핑해 read() 복사 없이 바이트를 그대로 파서에 전달
+                with open(file_path, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                        memoryview(mm) as view:
+                    data = orjson.loads(view)
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
             
             results = data.get('results', [])
             print(f"✅ 분석 결과 로드 완료: {len(results)}개의 블록")
@@ -151,6 +253,85 @@ class DataManager:
             print(f"❌ 결과 로드 중 오류 발생: {e}")
             return []
     
+    def get_checkpoint_path(self, csv_path: str, filter_criteria: str, window_size: int,
+                            overlap: int, recent_days: Optional[int], model: str) -> str:
+        """
+        분석 설정별 체크포인트(JSONL) 파일 경로 생성
+        CSV 파일이 바뀌거나 설정이 다르면 다른 경로가 되어 잘못 이어받지 않음
+        """
+        stat = os.stat(csv_path)
+        fingerprint = "|".join(str(value) for value in (
+            os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns,
+            filter_criteria, window_size, overlap, recent_days, model
+        ))
+        digest = hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+        return os.path.join(self.CHECKPOINT_DIR, f"analysis_{digest}.jsonl")
+    
+    def load_checkpoint(self, checkpoint_path: str) -> Dict[str, Tuple[float, Dict[str, Any]]]:
+        """
+        체크포인트에서 완료된 블록 결과 로드
+        
+        Returns:
+            {블록 내용 키: (매칭률, 비용정보)} 딕셔너리 (파일이 없으면 빈 딕셔너리)
+        """
+        completed = {}
+        if not os.path.exists(checkpoint_path):
+            return completed
+        
+        loads = orjson.loads if orjson is not None else json.loads
+        with open(checkpoint_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = loads(line)
+                except ValueError:
+                    continue  # 비정상 종료로 잘린 마지막 줄은 무시
+                cost_info = record['cost_info']
+                # 실패한 블록은 다시 분석 (failed 표시 이전에 기록된 실패 결과는 요약이 없음)
+                if cost_info.get('failed') or 'summary' not in cost_info:
+                    continue
+                # 블록 인덱스로만 기록된 이전 형식은 내용을 확인할 수 없으므로 사용하지 않음
+                if 'key' not in record:
+                    continue
+                completed[record['key']] = (record['match_rate'], cost_info)
+        
+        return completed
+    
+    def open_checkpoint(self, checkpoint_path: str):
+        """체크포인트 파일을 바이너리 추가 모드로 열기"""
+        os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        
+        # 잘린 마지막 줄 뒤에 이어 쓰지 않도록 줄바꿈 보정
+        needs_newline = False
+        if os.path.exists(checkpoint_path) and os.path.getsize(checkpoint_path) > 0:
+            with open(checkpoint_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        
+        checkpoint_file = open(checkpoint_path, 'ab')
+        if needs_newline:
+            checkpoint_file.write(b"\n")
+        return checkpoint_file
+    
+    def append_checkpoint(self, checkpoint_file, key: str, result: Tuple[float, Dict[str, Any]]):
+        """
+        완료된 블록 결과 한 줄 기록
+        
+        블록 인덱스가 아닌 내용 키(결과 캐시와 같은 해시)로 기록하므로 최근 N일 필터 등으로
+        윈도우가 밀려도 다른 블록에 결과가 붙지 않음
+        """
+        match_rate, cost_info = result
+        record = {"key": key, "match_rate": match_rate, "cost_info": cost_info}
+        if orjson is not None:
+            checkpoint_file.write(orjson.dumps(record) + b"\n")
+        else:
+            checkpoint_file.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+        checkpoint_file.flush()
+    
+    def remove_checkpoint(self, checkpoint_path: str):
+        """분석 완료 후 체크포인트 삭제"""
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    
     def filter_by_threshold(self, results: List[Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
         """
         임계값 이상의 매칭률을 가진 블록들을 필터링
@@ -162,10 +343,10 @@ class DataManager:
         Returns:
             필터링된 결과 리스트
         """
-        filtered_results = [
-            result for result in results 
-            if result.get('match_rate', 0) >= threshold
-        ]
+        # 매칭률 배열의 불리언 마스크로 한 번에 선택
+        match_rates = np.fromiter((result.get('match_rate', 0) for result in results),
+                                  dtype=np.float64, count=len(results))
+        filtered_results = [results[i] for i in np.flatnonzero(match_rates >= threshold).tolist()]
         
         print(f"✅ 임계값 {threshold}% 이상 블록: {len(filtered_results)}개")
         return filtered_results
@@ -183,15 +364,17 @@ class DataManager:
         if not results:
             return {}
         
-        match_rates = [result.get('match_rate', 0) for result in results]
+        # 매칭률을 배열로 한 번만 추출해 모든 통계를 벡터 연산으로 계산
+        match_rates = np.fromiter((result.get('match_rate', 0) for result in results),
+                                  dtype=np.float64, count=len(results))
         
         stats = {
             "total_blocks": len(results),
-            "average_match_rate": sum(match_rates) / len(match_rates),
-            "max_match_rate": max(match_rates),
-            "min_match_rate": min(match_rates),
-            "blocks_above_50": len([r for r in match_rates if r >= 50]),
-            "blocks_above_75": len([r for r in match_rates if r >= 75])
+            "average_match_rate": float(match_rates.mean()),
+            "max_match_rate": float(match_rates.max()),
+            "min_match_rate": float(match_rates.min()),
+            "blocks_above_50": int((match_rates >= 50).sum()),
+            "blocks_above_75": int((match_rates >= 75).sum())
         }
         
         return stats
@@ -211,45 +394,28 @@ class DataManager:
             # 현재 날짜에서 N일 전 계산
             cutoff_date = datetime.now() - timedelta(days=recent_days)
             
-            # Date 컬럼을 datetime으로 변환 (다양한 형식 시도)
-            date_formats = [
-                '%Y-%m-%d %H:%M:%S',  # 2024-06-23 14:30:22
-                '%Y-%m-%d',           # 2024-06-23
-                '%Y/%m/%d %H:%M:%S',  # 2024/06/23 14:30:22
-                '%Y/%m/%d',           # 2024/06/23
-                '%m/%d/%Y %H:%M:%S',  # 06/23/2024 14:30:22
-                '%m/%d/%Y',           # 06/23/2024
-                '%d/%m/%Y %H:%M:%S',  # 23/06/2024 14:30:22
-                '%d/%m/%Y'            # 23/06/2024
-            ]
+            with warnings.catch_warnings():
+                # 형식 추론 관련 경고(dayfirst 등)는 출력하지 않음
+                warnings.simplefilter('ignore', UserWarning)
+                
+                # Date 컬럼을 datetime으로 변환: 첫 값에서 추론한 형식으로 한 번에 파싱 (동일 문자열은 캐시)
+                parsed_dates = pd.to_datetime(df['Date'], errors='coerce', cache=True)
+                
+                # 추론한 형식과 다른 행만 값마다 형식을 판별해 다시 파싱 (여러 형식이 섞인 경우)
+                unparsed = parsed_dates.isna() & df['Date'].notna()
+                if unparsed.any():
+                    parsed_dates[unparsed] = pd.to_datetime(df.loc[unparsed, 'Date'], format='mixed',
+                                                            errors='coerce', cache=True)
             
-            df_filtered = df.copy()
-            parsed_dates = None
-            
-            for date_format in date_formats:
-                try:
-                    parsed_dates = pd.to_datetime(df_filtered['Date'], format=date_format, errors='coerce')
-                    if not parsed_dates.isna().all():  # 일부라도 파싱되면 성공
-                        break
-                except:
-                    continue
-            
-            # 파싱이 실패한 경우 기본 파싱 시도
-            if parsed_dates is None or parsed_dates.isna().all():
-                parsed_dates = pd.to_datetime(df_filtered['Date'], errors='coerce')
-            
-            # 파싱 실패한 행들 제거
+            # 파싱 실패한 행은 제외
             valid_dates_mask = ~parsed_dates.isna()
             if not valid_dates_mask.any():
                 print(f"⚠️ 날짜 파싱 실패 - 전체 데이터를 사용합니다")
                 return df
             
-            df_filtered = df_filtered[valid_dates_mask]
-            parsed_dates = parsed_dates[valid_dates_mask]
-            
-            # 최근 N일 이내 데이터 필터링
-            recent_mask = parsed_dates >= cutoff_date
-            df_recent = df_filtered[recent_mask]
+            # 최근 N일 이내 데이터 필터링 (불리언 인덱싱이 새 DataFrame을 만들므로 복사 불필요)
+            recent_mask = valid_dates_mask & (parsed_dates >= cutoff_date)
+            df_recent = df[recent_mask]
             
             original_count = len(df)
             filtered_count = len(df_recent)
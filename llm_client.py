@@ -4,34 +4,77 @@
 """
 
 import os
+import re
 import time
+import random
 import hashlib
-import json
 import asyncio
-from typing import List, Dict, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
-from anthropic import Anthropic
-from dotenv import load_dotenv
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Iterable, Optional, Callable
+import numpy as np
+from pricing import MODEL_PRICING
+from rate_limiter import RateLimiter
+from result_cache import ResultCache
 
-# 환경 변수 로드
-load_dotenv()
+# 응답 파싱용 정규식 (응답마다 컴파일/캐시 조회하지 않도록 모듈 로드 시 한 번만 컴파일)
+_MULTI_SCORE_RE = re.compile(r'^\s*\[?(\d+)\]?\.?\s*점수[:\s]*(\d+)\s*\|?\s*(?:요약[:\s]*)?(.*?)\s*$', re.MULTILINE)
+
+# 점수 추출 패턴 (앞에서부터 순서대로 시도)
+_SCORE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'점수[:\s]*(\d+)',  # "점수: 67" 형태
+    r'(\d+)\s*점',  # "67점" 형태
+    r'(\d+)\s*%',  # "67%" 형태
+    r'score[:\s]*(\d+)',  # "score: 67" 형태 (영어)
+    r'(\d+)'  # 기본 숫자 (마지막 시도)
+))
+
+# 요약 추출 패턴
+_SUMMARY_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+    r'요약[:\s]*(.+?)(?:\n|$)',  # "요약: 내용" 형태
+    r'summary[:\s]*(.+?)(?:\n|$)',  # "summary: 내용" 형태 (영어)
+    r'(?:점수[:\s]*\d+\s*\n?)(.+?)(?:\n|$)',  # 점수 다음 줄
+))
 
 
 class OptimizedClaudeClient:
     """성능 최적화된 Anthropic Claude API 클라이언트"""
     
-    # 모델별 가격 정보 (1K 토큰당 USD)
-    MODEL_PRICING = {
-        "claude-3-haiku-20240307": {"input": 0.00025, "output": 0.00125},
-        "claude-3-sonnet-20240229": {"input": 0.003, "output": 0.015},
-        "claude-3-opus-20240229": {"input": 0.015, "output": 0.075},
-        "claude-3-5-sonnet-20240620": {"input": 0.003, "output": 0.015},
-        "claude-3-5-haiku-20241022": {"input": 0.001, "output": 0.005}
+    # 모델별 가격 정보 (1K 토큰당 USD, pricing 모듈에 정의)
+    MODEL_PRICING = MODEL_PRICING
+    
+    # Message Batches API 요금 할인율 (일반 요금의 50%)
+    BATCH_DISCOUNT = 0.5
+    
+    # 프롬프트 캐시 토큰 요금 배율 (일반 입력 토큰 대비, 읽기 10% / 쓰기 125%)
+    CACHE_READ_RATE = 0.1
+    CACHE_WRITE_RATE = 1.25
+    
+    # HTTP 상태 코드별 에러 안내 메시지
+    ERROR_MESSAGES = {
+        401: "🔑 API 키 인증 실패 (API 키를 확인해주세요)",
+        403: "🚫 API 접근 권한 없음",
+        429: "⏳ API 사용량 한도 초과 (잠시 후 재시도)",
+        500: "🔧 서버 내부 오류 (잠시 후 재시도)",
+        502: "🔧 서버 일시 장애 (잠시 후 재시도)",
+        503: "🔧 서버 일시 장애 (잠시 후 재시도)",
+        504: "🔧 서버 일시 장애 (잠시 후 재시도)",
+        529: "🔧 서버 과부하 (잠시 후 재시도)"
     }
     
+    # 재시도 대기 시간 상한 (초)
+    MAX_RETRY_WAIT = 30.0
+    
+    # 메모리 캐시 최대 항목 수 (초과 시 가장 오래 사용하지 않은 항목부터 제거, 디스크 캐시에는 유지)
+    MEMORY_CACHE_SIZE = 10_000
+    
+    # 프롬프트 템플릿/평가기준/응답 파싱 버전 (바꾸면 올려서 이전 디스크 캐시 결과를 쓰지 않도록 함)
+    PROMPT_VERSION = 2
+    
     def __init__(self, model: str = "claude-3-haiku-20240307", max_workers: int = 5, 
-                 enable_cache: bool = True, max_retries: int = 3):
+                 enable_cache: bool = True, max_retries: int = 3,
+                 cache_path: str = ResultCache.DEFAULT_PATH):
         """
         최적화된 Claude 클라이언트 초기화
         
@@ -40,25 +83,45 @@ class OptimizedClaudeClient:
             max_workers: 병렬 처리 워커 수
             enable_cache: 캐싱 활성화 여부
             max_retries: 최대 재시도 횟수
+            cache_path: 디스크 캐시(SQLite) 파일 경로
         """
+        # .env는 API 키가 필요한 시점에만 로드 (모듈 임포트만으로 환경 변수를 바꾸지 않음)
+        from dotenv import load_dotenv
+        load_dotenv()
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY 환경 변수가 설정되지 않았습니다.")
         
+        # SDK 임포트가 무거우므로 클라이언트를 실제로 만들 때 불러옴 (가격 조회/결과 조회 명령은 SDK 불필요)
+        from anthropic import Anthropic, AsyncAnthropic
+        
         self.client = Anthropic(api_key=api_key)
+        # 동기 분석도 재시도는 analyze_chat_text가 직접 처리 (같은 연결 풀을 공유하는 재시도 없는 사본)
+        # 배치 제출/조회는 자체 재시도 루프가 없으므로 self.client(SDK 재시도 사용)로 호출
+        self.sync_scoring_client = self.client.with_options(max_retries=0)
+        # 재시도는 _acreate_message가 직접 처리 (SDK 내부 재시도가 겹치면 429가 레이트 리미터에 보이지 않음)
+        # 연결 풀은 이 클라이언트 하나를 모든 요청이 공유
+        self.async_client = AsyncAnthropic(api_key=api_key, max_retries=0)
         self.model = model
         self.max_workers = max_workers
         self.max_retries = max_retries
         
         # 성능 최적화 설정
         self.enable_cache = enable_cache
-        self.cache = {} if enable_cache else None
-        self.cache_lock = threading.Lock()
+        self.cache = OrderedDict() if enable_cache else None
+        # 재실행 시에도 재사용되는 디스크 캐시 (메모리 캐시 미스 시 조회)
+        self.disk_cache = ResultCache(cache_path) if enable_cache else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 내용이 같은 블록이라 API 호출 없이 결과를 공유한 블록 수
+        self.duplicate_blocks = 0
         
-        # 비용 추적 변수 (스레드 안전)
-        self.stats_lock = threading.Lock()
+        # 비용 추적 변수 (비동기 분석은 이벤트 루프 스레드 하나에서만 갱신하므로 락 없음)
+        # 동기 API는 여러 스레드에서 호출될 수 있으므로 캐시/통계를 건드리는 구간만 _sync_lock으로 직렬화
+        self._sync_lock = threading.Lock()
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self.total_cache_read_tokens = 0
         self.total_cost = 0.0
         self.request_count = 0
         self.failed_requests = 0
@@ -66,26 +129,37 @@ class OptimizedClaudeClient:
         
         # 성능 측정
         self.start_time = None
-        self.request_times = []
+        # 요청 시간(초)을 float 객체 대신 연속된 double 버퍼에 저장
+        self.request_times = array('d')
+        
+        # 필터 조건별로 미리 렌더링한 프롬프트 앞부분 (채팅만 바뀜)
+        self._prompt_prefixes = {}
     
     def calculate_filter_match_rate_single(self, chat_messages: List[Dict[str, str]], 
                                          filter_criteria: str) -> Tuple[float, Dict[str, Any]]:
         """
-        단일 채팅 블록의 필터 매칭률 계산 (스레드 안전)
+        단일 채팅 블록의 필터 매칭률 계산 (동기 호출, 스레드 안전)
+        """
+        # 채팅 메시지를 텍스트로 변환
+        return self.analyze_chat_text(self._format_chat_messages(chat_messages), filter_criteria)
+    
+    def analyze_chat_text(self, chat_text: str, filter_criteria: str) -> Tuple[float, Dict[str, Any]]:
+        """
+        포맷된 채팅 블록 텍스트의 필터 매칭률 계산 (동기 호출, 스레드 안전)
+        
+        API 호출은 동시에 진행하고, 캐시/사용량 통계를 갱신하는 구간만 _sync_lock으로 직렬화
         """
-        # 캐시 키 생성
+        # 캐시 키 생성 (포맷된 블록 내용 해시)
         cache_key = None
         if self.enable_cache:
-            cache_key = self._generate_cache_key(chat_messages, filter_criteria)
-            cached_result = self._get_from_cache(cache_key)
+            cache_key = self._generate_cache_key(chat_text, filter_criteria)
+            with self._sync_lock:
+                cached_result = self._get_from_cache(cache_key)
             if cached_result:
                 return cached_result
         
-        # 채팅 메시지를 텍스트로 변환
-        chat_text = self._format_chat_messages(chat_messages)
-        
         # 최적화된 프롬프트 생성
-        prompt = self._create_optimized_prompt(chat_text, filter_criteria)
+        content = self._create_message_content(chat_text, filter_criteria)
         
         # 재시도 로직으로 API 호출
         for attempt in range(self.max_retries):
@@ -93,159 +167,592 @@ class OptimizedClaudeClient:
                 start_time = time.time()
                 
                 # Claude API 호출
-                response = self.client.messages.create(
+                response = self.sync_scoring_client.messages.create(
                     model=self.model,
                     max_tokens=80,  # 점수와 요약을 위해 증가
                     temperature=0.0,  # 일관성을 위해 0으로 설정
-                    messages=[{"role": "user", "content": prompt}]
+                    messages=[{"role": "user", "content": content}]
                 )
                 
                 request_time = time.time() - start_time
+                with self._sync_lock:
+                    return self._process_response(response, request_time, cache_key)
                 
-                # 토큰 사용량 및 비용 계산
-                input_tokens = response.usage.input_tokens
-                output_tokens = response.usage.output_tokens
-                cost_info = self._calculate_cost(input_tokens, output_tokens)
+            except Exception as e:
+                error_msg = self._format_error_message(e)
+                rate_limited = self._is_rate_limited(e)
                 
-                # 누적 통계 업데이트 (스레드 안전)
-                self._update_usage_stats(input_tokens, output_tokens, 
-                                       cost_info['request_cost'], request_time)
+                # 429 에러 카운트
+                if rate_limited:
+                    with self._sync_lock:
+                        self.rate_limit_count += 1
                 
-                # 응답에서 점수와 요약 추출
-                score, summary = self._extract_score_and_summary(response.content[0].text)
+                if attempt == self.max_retries - 1:
+                    print(f"❌ API 호출 실패 (최대 재시도 초과): {error_msg}")
+                    with self._sync_lock:
+                        self.failed_requests += 1
+                    return self._failed_result()
                 
-                # 비용 정보에 요약 추가
+                wait_time = self._retry_wait_time(e, attempt, rate_limited)
+                if rate_limited and attempt == 0:
+                    print(f"⏳ API 사용량 한도 초과 - 대기 후 재시도합니다...")
+                
+                if attempt < self.max_retries - 1:  # 마지막 시도가 아닐 때만 메시지 출력
+                    print(f"⚠️ 재시도 {attempt + 1}/{self.max_retries} ({wait_time:.1f}초 대기): {error_msg}")
+                time.sleep(wait_time)
+        
+        return self._failed_result()
+    
+    async def acalculate_filter_match_rate_single(self, chat_messages: List[Dict[str, str]],
+                                                  filter_criteria: str, rate_limiter: RateLimiter = None,
+                                                  estimated_tokens: int = 0) -> Tuple[float, Dict[str, Any]]:
+        """
+        단일 채팅 블록의 필터 매칭률 계산 (asyncio, 논블로킹 HTTP)
+        """
+        return await self.aanalyze_chat_text(self._format_chat_messages(chat_messages), filter_criteria,
+                                             rate_limiter, estimated_tokens)
+    
+    async def aanalyze_chat_text(self, chat_text: str, filter_criteria: str,
+                                 rate_limiter: RateLimiter = None,
+                                 estimated_tokens: int = 0) -> Tuple[float, Dict[str, Any]]:
+        """
+        포맷된 채팅 블록 텍스트의 필터 매칭률 계산 (asyncio, 논블로킹 HTTP)
+        
+        Args:
+            chat_text: 포맷된 채팅 블록 텍스트
+            filter_criteria: 필터 조건
+            rate_limiter: RPM/TPM 레이트 리미터 (None이면 제한 없음)
+            estimated_tokens: 요청당 예상 토큰 수 (TPM 계산용)
+        """
+        # 캐시 키 생성 (포맷된 블록 내용 해시)
+        cache_key = None
+        if self.enable_cache:
+            cache_key = self._generate_cache_key(chat_text, filter_criteria)
+            cached_result = self._get_from_cache(cache_key)
+            if cached_result:
+                return cached_result
+        
+        return await self._aanalyze_uncached(chat_text, filter_criteria, cache_key,
+                                             rate_limiter, estimated_tokens)
+    
+    async def _aanalyze_uncached(self, chat_text: str, filter_criteria: str, cache_key: str = None,
+                                 rate_limiter: RateLimiter = None,
+                                 estimated_tokens: int = 0) -> Tuple[float, Dict[str, Any]]:
+        """캐시 조회가 끝난 단일 블록을 API로 분석"""
+        content = self._create_message_content(chat_text, filter_criteria)
+        sent = await self._acreate_message(content, 80, rate_limiter, estimated_tokens)
+        if sent is None:
+            return self._failed_result()
+        
+        response, request_time = sent
+        try:
+            return self._process_response(response, request_time, cache_key)
+        except Exception as e:
+            # 응답 처리 오류는 이 블록만 실패로 처리 (같이 실행 중인 다른 블록은 계속 진행)
+            error_msg = self._format_error_message(e)
+            print(f"❌ 응답 처리 중 오류: {error_msg}")
+            self.failed_requests += 1
+            return self._failed_result()
+    
+    async def aanalyze_chat_texts(self, chat_texts: List[str], filter_criteria: str,
+                                  rate_limiter: RateLimiter = None,
+                                  estimated_tokens: int = 0) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        여러 채팅 블록을 한 번의 요청으로 분석 (프롬프트 고정 부분을 블록들이 나눠 씀)
+        
+        Args:
+            chat_texts: 포맷된 채팅 블록 텍스트들
+            filter_criteria: 필터 조건
+            rate_limiter: RPM/TPM 레이트 리미터 (None이면 제한 없음)
+            estimated_tokens: 블록당 예상 토큰 수 (TPM 계산용)
+        
+        Returns:
+            입력 순서대로의 (매칭률, 비용정보) 튜플 리스트
+        """
+        results = [None] * len(chat_texts)
+        cache_keys = [None] * len(chat_texts)
+        pending = []
+        for i, chat_text in enumerate(chat_texts):
+            if self.enable_cache:
+                cache_keys[i] = self._generate_cache_key(chat_text, filter_criteria)
+                results[i] = self._get_from_cache(cache_keys[i])
+                if results[i]:
+                    continue
+            pending.append(i)
+        
+        if len(pending) == 1:
+            i = pending[0]
+            results[i] = await self._aanalyze_uncached(chat_texts[i], filter_criteria, cache_keys[i],
+                                                       rate_limiter, estimated_tokens)
+            return results
+        if not pending:
+            return results
+        
+        content = self._create_multi_block_content([chat_texts[i] for i in pending], filter_criteria)
+        sent = await self._acreate_message(content, 80 * len(pending), rate_limiter,
+                                           estimated_tokens * len(pending))
+        if sent is None:
+            for i in pending:
+                results[i] = self._failed_result()
+            return results
+        
+        response, request_time = sent
+        input_tokens, output_tokens, cache_read_tokens, cache_write_tokens = self._usage_tokens(response)
+        request_cost = self._calculate_cost(input_tokens, output_tokens, False,
+                                            cache_read_tokens, cache_write_tokens)['request_cost']
+        self._update_usage_stats(input_tokens, output_tokens, request_cost, request_time, cache_read_tokens)
+        
+        parsed = self._extract_multi_scores(response.content[0].text, len(pending))
+        answered = [(i, parsed[n]) for n, i in enumerate(pending) if parsed[n] is not None]
+        missing = [i for n, i in enumerate(pending) if parsed[n] is None]
+        
+        # 토큰은 응답된 블록 수로 나눠 배분 (블록별 비용의 합 = 요청 비용)
+        # 점수 줄을 하나도 찾지 못하면 요청 비용은 누적 통계에만 한 번 반영하고 모든 블록을 다시 분석
+        if answered:
+            block_count = len(answered)
+            shares = [divmod(tokens, block_count)
+                      for tokens in (input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)]
+            for n, (i, (score, summary)) in enumerate(answered):
+                block_input, block_output, block_read, block_write = (share + (n < rest) for share, rest in shares)
+                cost_info = self._calculate_cost(block_input, block_output, False, block_read, block_write)
                 cost_info['summary'] = summary
-                result = (score, cost_info)
+                results[i] = (score, cost_info)
+                if self.enable_cache:
+                    self._save_to_cache(cache_keys[i], results[i])
+        
+        # 응답에서 빠진 블록은 개별 요청으로 다시 분석
+        for i in missing:
+            results[i] = await self._aanalyze_uncached(chat_texts[i], filter_criteria, cache_keys[i],
+                                                       rate_limiter, estimated_tokens)
+        
+        return results
+    
+    async def _acreate_message(self, content: List[Dict[str, Any]], max_tokens: int,
+                               rate_limiter: RateLimiter = None, estimated_tokens: int = 0):
+        """
+        재시도/레이트 리미트를 적용한 비동기 API 호출
+        
+        Returns:
+            (응답, 요청 시간) 튜플, 최대 재시도 초과 시 None
+        """
+        for attempt in range(self.max_retries):
+            if rate_limiter:
+                await rate_limiter.acquire(estimated_tokens)
+            
+            try:
+                start_time = time.time()
                 
-                # 캐시에 저장
-                if self.enable_cache and cache_key:
-                    self._save_to_cache(cache_key, result)
+                response = await self.async_client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    temperature=0.0,
+                    messages=[{"role": "user", "content": content}]
+                )
                 
-                return result
+                request_time = time.time() - start_time
+                if rate_limiter:
+                    rate_limiter.release()
+                return response, request_time
                 
             except Exception as e:
                 error_msg = self._format_error_message(e)
+                rate_limited = self._is_rate_limited(e)
                 
-                # 429 에러 카운트
-                if "429" in str(e) or "rate_limit_exceeded" in str(e).lower():
-                    with self.stats_lock:
-                        self.rate_limit_count += 1
+                # 429 에러면 동시성 절반으로 축소 (AIMD)
+                if rate_limiter:
+                    rate_limiter.release(rate_limited=rate_limited)
+                
+                if rate_limited:
+                    self.rate_limit_count += 1
                 
                 if attempt == self.max_retries - 1:
                     print(f"❌ API 호출 실패 (최대 재시도 초과): {error_msg}")
-                    with self.stats_lock:
-                        self.failed_requests += 1
-                    return 0.0, {"request_cost": 0.0, "input_tokens": 0, "output_tokens": 0}
+                    self.failed_requests += 1
+                    return None
                 
-                # 429 에러의 경우 더 긴 대기시간
-                if "429" in str(e) or "rate_limit_exceeded" in str(e).lower():
-                    wait_time = (2 ** attempt) * 2 + (time.time() % 1)  # 더 긴 대기
-                    if attempt == 0:
-                        print(f"⏳ API 사용량 한도 초과 - 대기 후 재시도합니다...")
-                else:
-                    wait_time = (2 ** attempt) + (time.time() % 1)
+                wait_time = self._retry_wait_time(e, attempt, rate_limited)
+                if rate_limited and attempt == 0:
+                    print(f"⏳ API 사용량 한도 초과 - 대기 후 재시도합니다...")
                 
-                if attempt < self.max_retries - 1:  # 마지막 시도가 아닐 때만 메시지 출력
-                    print(f"⚠️ 재시도 {attempt + 1}/{self.max_retries} ({wait_time:.1f}초 대기): {error_msg}")
-                time.sleep(wait_time)
+                print(f"⚠️ 재시도 {attempt + 1}/{self.max_retries} ({wait_time:.1f}초 대기): {error_msg}")
+                # 이벤트 루프를 막지 않도록 비동기 대기
+                await asyncio.sleep(wait_time)
+        
+        return None
+    
+    def _retry_wait_time(self, error: Exception, attempt: int, rate_limited: bool) -> float:
+        """
+        재시도 전 대기 시간 계산
+        
+        서버가 Retry-After 헤더를 주면 그 값을 따르고, 없으면 지수 백오프에 무작위 지터를 더함
+        (워커마다 지터가 달라야 429 직후 동시에 재시도하지 않음)
+        """
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
         
-        return 0.0, {"request_cost": 0.0, "input_tokens": 0, "output_tokens": 0}
+        # 429 에러의 경우 더 긴 대기시간
+        base = 2.0 if rate_limited else 1.0
+        return min(self.MAX_RETRY_WAIT, base * (2 ** attempt) * (1 + random.uniform(0, 0.5)))
+    
+    def _process_response(self, response, request_time: float = None, 
+                          cache_key: str = None, batch: bool = False) -> Tuple[float, Dict[str, Any]]:
+        """API 응답을 (매칭률, 비용정보)로 변환하고 통계/캐시 갱신 (동기/비동기/배치 공용)"""
+        # 토큰 사용량 및 비용 계산
+        input_tokens, output_tokens, cache_read_tokens, cache_write_tokens = self._usage_tokens(response)
+        cost_info = self._calculate_cost(input_tokens, output_tokens, batch,
+                                         cache_read_tokens, cache_write_tokens)
+        
+        # 누적 통계 업데이트
+        self._update_usage_stats(input_tokens, output_tokens, 
+                               cost_info['request_cost'], request_time, cache_read_tokens)
+        
+        # 응답에서 점수와 요약 추출
+        score, summary = self._extract_score_and_summary(response.content[0].text)
+        
+        # 비용 정보에 요약 추가
+        cost_info['summary'] = summary
+        result = (score, cost_info)
+        
+        # 캐시에 저장
+        if self.enable_cache and cache_key:
+            self._save_to_cache(cache_key, result)
+        
+        return result
     
     def batch_analyze_parallel(self, chat_blocks: List[List[Dict[str, str]]], 
                              filter_criteria: str, 
-                             progress_callback=None) -> List[Tuple[float, Dict[str, Any]]]:
+                             progress_callback=None,
+                             rate_limiter: RateLimiter = None,
+                             blocks_per_request: int = 1,
+                             rpm: int = RateLimiter.DEFAULT_RPM,
+                             tpm: int = RateLimiter.DEFAULT_TPM) -> List[Tuple[float, Dict[str, Any]]]:
         """
-        병렬 처리로 여러 채팅 블록을 일괄 분석
+        병렬 처리로 여러 채팅 블록을 일괄 분석 (asyncio 기반, 실행 중인 이벤트 루프 밖에서 호출)
         
         Args:
             chat_blocks: 채팅 블록들의 리스트
             filter_criteria: 필터 조건
             progress_callback: 진행상황 콜백 함수
+            rate_limiter: RPM/TPM 레이트 리미터 (None이면 rpm/tpm 한도 + max_workers 동시성으로 생성)
+            blocks_per_request: 한 번의 API 요청에 묶어 보낼 블록 수 (기본값: 1)
+            rpm: rate_limiter가 None일 때 분당 최대 요청 수 (기본값: 50, Tier 1 기준이므로 상위 티어는 올려서 지정)
+            tpm: rate_limiter가 None일 때 분당 최대 토큰 수 (기본값: 80,000)
         
         Returns:
             (매칭률, 비용정보) 튜플들의 리스트
         """
+        # 이벤트 루프가 없는 동기 호출자용 진입점
+        return asyncio.run(self.abatch_analyze_parallel(chat_blocks, filter_criteria, progress_callback,
+                                                        rate_limiter, blocks_per_request, rpm, tpm))
+    
+    async def abatch_analyze_parallel(self, chat_blocks: List[List[Dict[str, str]]],
+                                      filter_criteria: str,
+                                      progress_callback=None,
+                                      rate_limiter: RateLimiter = None,
+                                      blocks_per_request: int = 1,
+                                      rpm: int = RateLimiter.DEFAULT_RPM,
+                                      tpm: int = RateLimiter.DEFAULT_TPM) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        asyncio로 여러 채팅 블록을 동시에 분석 (세마포어로 동시 요청 수를 max_workers로 제한)
+        
+        Args:
+            chat_blocks: 채팅 블록들의 리스트
+            filter_criteria: 필터 조건
+            progress_callback: 진행상황 콜백 함수
+            rate_limiter: RPM/TPM 레이트 리미터 (None이면 rpm/tpm 한도 + max_workers 동시성으로 생성)
+            blocks_per_request: 한 번의 API 요청에 묶어 보낼 블록 수 (기본값: 1)
+            rpm: rate_limiter가 None일 때 분당 최대 요청 수 (기본값: 50, Tier 1 기준이므로 상위 티어는 올려서 지정)
+            tpm: rate_limiter가 None일 때 분당 최대 토큰 수 (기본값: 80,000)
+        
+        Returns:
+            (매칭률, 비용정보) 튜플들의 리스트
+        """
+        # 토큰 추정은 NumPy/Numba를 쓰므로 병렬 분석을 실제로 할 때 불러옴
+        from token_estimator import estimate_prompt_tokens
+        
         self.start_time = time.time()
-        results = [None] * len(chat_blocks)
+        # 429가 이어지면 허용 동시성을 절반으로 줄이고 성공이 쌓이면 다시 늘림 (AIMD)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(rpm=rpm, tpm=tpm, max_concurrency=self.max_workers)
+        chat_texts = [self._format_chat_messages(block) for block in chat_blocks]
+        results = [None] * len(chat_texts)
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 모든 작업을 병렬로 제출
-            future_to_index = {
-                executor.submit(self.calculate_filter_match_rate_single, block, filter_criteria): i
-                for i, block in enumerate(chat_blocks)
-            }
+        # TPM 계산용 블록당 예상 토큰 수 (평균 입력 토큰 + 출력 max_tokens)
+        estimated_tokens = 0
+        if chat_texts:
+            total_input_tokens = sum(estimate_prompt_tokens(self._create_optimized_prompt(chat_text, filter_criteria))
+                                     for chat_text in chat_texts)
+            estimated_tokens = total_input_tokens // len(chat_texts) + 80
+        
+        completed = 0
+        async for block_results in self._aanalyze_blocks(chat_texts.__getitem__, range(len(chat_texts)),
+                                                          filter_criteria, rate_limiter, estimated_tokens,
+                                                          blocks_per_request):
+            for index, result in block_results:
+                results[index] = result
+            completed += len(block_results)
             
-            completed = 0
-            for future in as_completed(future_to_index):
-                index = future_to_index[future]
+            # 진행상황 콜백 호출
+            if progress_callback:
+                progress_callback(completed, len(chat_texts), block_results[-1][1][0])
+        
+        return results
+    
+    async def _aanalyze_blocks(self, chat_text_of: Callable[[int], str], indices: Iterable[int],
+                               filter_criteria: str, rate_limiter: RateLimiter = None,
+                               estimated_tokens: int = 0, blocks_per_request: int = 1):
+        """
+        중복을 제외한 블록들을 blocks_per_request개씩 묶어 동시에 분석 (세마포어로 동시 요청 수를 max_workers로 제한)
+        
+        Args:
+            chat_text_of: 블록 인덱스로 포맷된 채팅 블록 텍스트를 만드는 함수 (전송 직전에 다시 호출)
+            indices: 분석할 블록 인덱스들
+            filter_criteria: 필터 조건
+            rate_limiter: RPM/TPM 레이트 리미터 (None이면 제한 없음)
+            estimated_tokens: 블록당 예상 토큰 수 (TPM 계산용)
+            blocks_per_request: 한 번의 API 요청에 묶어 보낼 블록 수 (기본값: 1)
+        
+        Yields:
+            요청이 끝날 때마다 (블록 인덱스, (매칭률, 비용정보)) 리스트 (중복 블록 결과 포함)
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+        duplicates = {}
+        pending = [i for i, _, _ in self._unique_blocks(((i, chat_text_of(i)) for i in indices),
+                                                        filter_criteria, duplicates)]
+        
+        async def analyze_group(group: List[int]):
+            async with semaphore:
                 try:
-                    result = future.result()
-                    results[index] = result
-                    completed += 1
-                    
-                    # 진행상황 콜백 호출
-                    if progress_callback:
-                        progress_callback(completed, len(chat_blocks), result[0])
-                        
+                    # 블록 텍스트는 전송 직전에 생성 (처리 중인 블록만 메모리에 유지)
+                    chat_texts = [chat_text_of(i) for i in group]
+                    if len(chat_texts) == 1:
+                        group_results = [await self.aanalyze_chat_text(chat_texts[0], filter_criteria,
+                                                                       rate_limiter, estimated_tokens)]
+                    else:
+                        group_results = await self.aanalyze_chat_texts(chat_texts, filter_criteria,
+                                                                       rate_limiter, estimated_tokens)
+                    return list(zip(group, group_results))
                 except Exception as e:
+                    # 오류가 난 묶음만 실패로 처리 (나머지 블록의 분석은 계속 진행)
                     error_msg = self._format_error_message(e)
-                    print(f"❌ 블록 {index + 1} 처리 중 오류: {error_msg}")
-                    results[index] = (0.0, {"request_cost": 0.0, "input_tokens": 0, "output_tokens": 0})
-                    completed += 1
-                    
-                    if progress_callback:
-                        progress_callback(completed, len(chat_blocks), 0.0)
+                    print(f"❌ 블록 {group[0] + 1} 처리 중 오류: {error_msg}")
+                    return [(index, self._failed_result()) for index in group]
         
-        return results
+        # blocks_per_request개씩 묶어 한 요청으로 분석 (기본값 1이면 블록마다 요청)
+        group_size = max(1, blocks_per_request)
+        tasks = [asyncio.create_task(analyze_group(pending[i:i + group_size]))
+                 for i in range(0, len(pending), group_size)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                block_results = []
+                for index, result in await future:
+                    block_results += self._with_duplicates(index, result, duplicates)
+                yield block_results
+        finally:
+            # 호출자가 중간에 멈추면 남은 요청 취소
+            for task in tasks:
+                task.cancel()
+            self._flush_disk_cache()
+    
+    def batch_analyze_message_batch(self, chat_texts: Iterable[str],
+                                    filter_criteria: str, poll_interval: float = 30.0,
+                                    progress_callback=None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Message Batches API로 여러 채팅 블록을 한 번에 제출하여 분석 (50% 할인)
+        
+        Args:
+            chat_texts: 포맷된 채팅 블록 텍스트들 (리스트 또는 지연 생성 이터러블)
+            filter_criteria: 필터 조건
+            poll_interval: 배치 상태 확인 간격 (초)
+            progress_callback: 진행상황 콜백 함수
+        
+        Returns:
+            (매칭률, 비용정보) 튜플들의 리스트
+        """
+        self.start_time = time.time()
+        # 첫 블록 인덱스별 결과/캐시 키 (중복 블록은 마지막에 첫 블록 결과를 복사)
+        results = {}
+        cache_keys = {}
+        duplicates = {}
+        
+        # 캐시에 있는 블록은 제출하지 않음
+        requests = []
+        for i, chat_text, cache_key in self._unique_blocks(enumerate(chat_texts), filter_criteria, duplicates):
+            cache_keys[i] = cache_key
+            if self.enable_cache:
+                cached_result = self._get_from_cache(cache_key)
+                if cached_result:
+                    results[i] = cached_result
+                    continue
+            
+            content = self._create_message_content(chat_text, filter_criteria)
+            requests.append({
+                "custom_id": f"block_{i}",
+                "params": {
+                    "model": self.model,
+                    "max_tokens": 80,
+                    "temperature": 0.0,
+                    "messages": [{"role": "user", "content": content}]
+                }
+            })
+        
+        block_count = len(cache_keys) + sum(len(indices) for indices in duplicates.values())
+        if not requests:
+            return self._fill_duplicates(results, duplicates, block_count)
+        
+        batch = self.client.messages.batches.create(requests=requests)
+        print(f"📦 배치 제출 완료: {batch.id} ({len(requests):,}개 요청)")
+        
+        # 처리 완료까지 주기적으로 상태 확인
+        cached_count = block_count - len(requests)
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = self.client.messages.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            if progress_callback:
+                done = counts.succeeded + counts.errored + counts.canceled + counts.expired
+                progress_callback(cached_count + done, block_count, 0.0)
+        
+        # 결과 스트리밍 후 custom_id로 원래 블록 위치에 매핑
+        for entry in self.client.messages.batches.results(batch.id):
+            index = int(entry.custom_id.split("_", 1)[1])
+            if entry.result.type == "succeeded":
+                results[index] = self._process_response(entry.result.message, None,
+                                                        cache_keys[index], batch=True)
+            else:
+                print(f"❌ 블록 {index + 1} 처리 실패: {entry.result.type}")
+                self.failed_requests += 1
+                results[index] = self._failed_result()
+        
+        if progress_callback:
+            progress_callback(block_count, block_count, 0.0)
+        
+        self._flush_disk_cache()
+        return self._fill_duplicates(results, duplicates, block_count)
+    
+    def _unique_blocks(self, indexed_texts: Iterable[Tuple[int, str]], filter_criteria: str,
+                       duplicates: Dict[int, List[int]]) -> Iterable[Tuple[int, str, str]]:
+        """
+        내용이 같은 블록 중 첫 블록만 (인덱스, 텍스트, 캐시 키)로 내보냄 (동기/비동기/배치 공용)
+        
+        캐시 키(필터 조건 + 모델 + 블록 내용 해시)가 같은 블록은 duplicates[첫 블록 인덱스]에 모아
+        첫 블록의 결과를 공유하도록 함
+        """
+        first_index = {}
+        for i, chat_text in indexed_texts:
+            cache_key = self._generate_cache_key(chat_text, filter_criteria)
+            first = first_index.setdefault(cache_key, i)
+            if first != i:
+                duplicates.setdefault(first, []).append(i)
+                self.duplicate_blocks += 1
+                continue
+            yield i, chat_text, cache_key
+    
+    def _with_duplicates(self, index: int, result: Tuple[float, Dict[str, Any]],
+                         duplicates: Dict[int, List[int]]) -> List[Tuple[int, Tuple[float, Dict[str, Any]]]]:
+        """첫 블록 결과와 그 중복 블록들에 비용 0으로 복사한 결과의 (인덱스, 결과) 리스트"""
+        return [(index, result)] + [(duplicate, self._reused_result(result, "duplicate"))
+                                    for duplicate in duplicates.get(index, ())]
+    
+    def _fill_duplicates(self, results: Dict[int, Tuple[float, Dict[str, Any]]],
+                         duplicates: Dict[int, List[int]], block_count: int) -> List[Tuple[float, Dict[str, Any]]]:
+        """첫 블록 인덱스별 결과를 중복 블록 자리까지 채운 원래 블록 순서의 리스트로 변환"""
+        block_results = [None] * block_count
+        for index, result in results.items():
+            for block_index, block_result in self._with_duplicates(index, result, duplicates):
+                block_results[block_index] = block_result
+        return block_results
+    
+    def _generate_cache_key(self, chat_text: str, filter_criteria: str) -> str:
+        """캐시 키 생성 (프롬프트 버전 + 필터 조건 + 모델 + 포맷된 블록 내용의 BLAKE2b 해시)"""
+        content = f"v{self.PROMPT_VERSION}|{filter_criteria}|{self.model}|{chat_text}"
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
     
-    def _generate_cache_key(self, chat_messages: List[Dict[str, str]], filter_criteria: str) -> str:
-        """캐시 키 생성"""
-        content = json.dumps(chat_messages, sort_keys=True) + filter_criteria + self.model
-        return hashlib.md5(content.encode()).hexdigest()
+    def _flush_disk_cache(self):
+        """디스크 캐시에 모아 둔 쓰기 커밋 (분석이 끝날 때 호출)"""
+        if self.disk_cache is not None:
+            self.disk_cache.flush()
     
     def _get_from_cache(self, cache_key: str) -> Tuple[float, Dict[str, Any]]:
-        """캐시에서 결과 조회"""
+        """캐시에서 결과 조회 (메모리 → 디스크 순, 적중 시 비용 0으로 반환)"""
         if not self.enable_cache:
             return None
             
-        with self.cache_lock:
-            return self.cache.get(cache_key)
+        result = self.cache.get(cache_key)
+        if result is not None:
+            self.cache.move_to_end(cache_key)
+        
+        if result is None:
+            result = self.disk_cache.get(cache_key)
+            if result is not None:
+                self._remember(cache_key, result)
+        
+        if result is None:
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        
+        # 캐시 적중은 API 호출이 없으므로 비용 0
+        return self._reused_result(result, "cached")
+    
+    def _reused_result(self, result: Tuple[float, Dict[str, Any]], reason: str) -> Tuple[float, Dict[str, Any]]:
+        """API 호출 없이 재사용한 결과 (비용/토큰 0, reason 키로 재사용 사유 표시)"""
+        match_rate, cost_info = result
+        reused = {**cost_info, "request_cost": 0.0, "input_tokens": 0, "output_tokens": 0,
+                  "input_cost": 0.0, "output_cost": 0.0, reason: True}
+        reused.pop("cache_read_tokens", None)
+        reused.pop("cache_write_tokens", None)
+        return match_rate, reused
+    
+    @staticmethod
+    def _failed_result() -> Tuple[float, Dict[str, Any]]:
+        """API 호출에 실패한 블록의 0점 결과 (failed 키로 실패 표시, 체크포인트/캐시에 기록하지 않음)"""
+        return 0.0, {"request_cost": 0.0, "input_tokens": 0, "output_tokens": 0, "failed": True}
     
     def _save_to_cache(self, cache_key: str, result: Tuple[float, Dict[str, Any]]):
-        """캐시에 결과 저장"""
+        """캐시에 결과 저장 (메모리 + 디스크)"""
         if not self.enable_cache:
             return
             
-        with self.cache_lock:
-            self.cache[cache_key] = result
+        self._remember(cache_key, result)
+        self.disk_cache.set(cache_key, result)
+    
+    def _remember(self, cache_key: str, result: Tuple[float, Dict[str, Any]]):
+        """메모리 LRU 캐시에 저장 (최대 크기 초과 시 가장 오래된 항목 제거)"""
+        self.cache[cache_key] = result
+        self.cache.move_to_end(cache_key)
+        if len(self.cache) > self.MEMORY_CACHE_SIZE:
+            self.cache.popitem(last=False)
     
     def _format_chat_messages(self, messages: List[Dict[str, str]]) -> str:
-        """채팅 메시지를 분석용 텍스트로 포맷팅 (최적화)"""
-        formatted_lines = []
-        for msg in messages:
-            message = msg.get('message', '').strip()
-            user = msg.get('user', '').strip()
-            
-            if message:  # 빈 메시지는 제외
-                # 간결한 형태로 포맷팅 (토큰 절약)
-                formatted_lines.append(f"{user}: {message}")
+        """
+        채팅 메시지를 분석용 텍스트로 포맷팅 (최적화)
         
-        return "\n".join(formatted_lines)
+        DataManager.load_csv에서 이미 공백 제거/빈 메시지 제거를 하므로 다시 strip하지 않음
+        """
+        # 간결한 형태로 포맷팅 (토큰 절약), 빈 메시지는 제외
+        return "\n".join(f"{msg.get('user', '')}: {msg['message']}" for msg in messages if msg.get('message'))
     
-    def _create_optimized_prompt(self, chat_text: str, filter_criteria: str) -> str:
-        """최적화된 프롬프트 생성 (토큰 절약)"""
-        return f"""채팅 분석: "{filter_criteria}" 조건에 대한 매칭도를 0-100 정수 점수로 평가하고 대화 내용을 한줄로 요약하세요.
-
-채팅:
-{chat_text}
-
-평가기준:
+    # 단일/다중 블록 프롬프트 공통 평가기준
+    SCORING_RUBRIC = """평가기준:
 - 0-20: 전혀 관련 없음
 - 21-40: 약간 관련 있음
 - 41-60: 보통 관련 있음  
 - 61-80: 많이 관련 있음
-- 81-100: 매우 관련 있음
+- 81-100: 매우 관련 있음"""
+    
+    def _get_prompt_prefix(self, filter_criteria: str) -> str:
+        """필터 조건과 평가기준/응답 형식을 미리 채운 프롬프트 앞부분 (필터 조건당 한 번 생성)"""
+        prefix = self._prompt_prefixes.get(filter_criteria)
+        if prefix is None:
+            prefix = f"""채팅 분석: "{filter_criteria}" 조건에 대한 매칭도를 0-100 정수 점수로 평가하고 대화 내용을 한줄로 요약하세요.
+
+{self.SCORING_RUBRIC}
 
 응답 형식:
 점수: [0-100 정수]
@@ -253,51 +760,90 @@ class OptimizedClaudeClient:
 
 예시:
 점수: 67
-요약: 김선태와 허진영이 프로젝트 일정과 업무 분담에 대해 논의함"""
+요약: 김선태와 허진영이 프로젝트 일정과 업무 분담에 대해 논의함
+
+채팅:
+"""
+            self._prompt_prefixes[filter_criteria] = prefix
+        return prefix
     
-    def _extract_score_and_summary(self, response_text: str) -> tuple[float, str]:
-        """Claude 응답에서 점수와 요약 추출"""
-        import re
-        
-        score = 0.0
-        summary = "분석 불가"
-        
-        # 점수 추출 패턴
-        score_patterns = [
-            r'점수[:\s]*(\d+)',  # "점수: 67" 형태
-            r'(\d+)\s*점',  # "67점" 형태
-            r'(\d+)\s*%',  # "67%" 형태
-            r'score[:\s]*(\d+)',  # "score: 67" 형태 (영어)
-            r'(\d+)'  # 기본 숫자 (마지막 시도)
-        ]
+    def _get_multi_prompt_prefix(self, filter_criteria: str) -> str:
+        """여러 블록을 한 번에 평가하는 프롬프트 앞부분 (필터 조건당 한 번 생성)"""
+        key = ("multi", filter_criteria)
+        prefix = self._prompt_prefixes.get(key)
+        if prefix is None:
+            prefix = f"""채팅 분석: 아래 각 채팅 블록마다 "{filter_criteria}" 조건에 대한 매칭도를 0-100 정수 점수로 평가하고 대화 내용을 한줄로 요약하세요.
+
+{self.SCORING_RUBRIC}
+
+응답 형식 (블록마다 한 줄씩, 블록 번호 순서대로):
+[블록 번호] 점수: [0-100 정수] | 요약: [대화 내용을 간단히 한줄로 요약]
+
+예시:
+[1] 점수: 67 | 요약: 김선태와 허진영이 프로젝트 일정과 업무 분담에 대해 논의함
+[2] 점수: 5 | 요약: 점심 메뉴에 대한 잡담
+
+"""
+            self._prompt_prefixes[key] = prefix
+        return prefix
+    
+    def _create_optimized_prompt(self, chat_text: str, filter_criteria: str) -> str:
+        """최적화된 프롬프트 생성 (토큰 절약, 고정된 앞부분 + 채팅)"""
+        return self._get_prompt_prefix(filter_criteria) + chat_text
+    
+    def _create_message_content(self, chat_text: str, filter_criteria: str) -> List[Dict[str, Any]]:
+        """
+        API 요청용 메시지 content 블록 생성
         
-        # 요약 추출 패턴
-        summary_patterns = [
-            r'요약[:\s]*(.+?)(?:\n|$)',  # "요약: 내용" 형태
-            r'summary[:\s]*(.+?)(?:\n|$)',  # "summary: 내용" 형태 (영어)
-            r'(?:점수[:\s]*\d+\s*\n?)(.+?)(?:\n|$)',  # 점수 다음 줄
+        모든 블록에 공통인 앞부분에 cache_control을 지정하여 프롬프트 캐싱 대상으로 표시
+        """
+        return [
+            {"type": "text", "text": self._get_prompt_prefix(filter_criteria),
+             "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": chat_text}
         ]
-        
-        # 점수 추출
-        for pattern in score_patterns:
-            matches = re.findall(pattern, response_text, re.IGNORECASE)
-            if matches:
-                try:
-                    score = float(matches[0])
-                    score = max(0.0, min(100.0, score))
-                    break
-                except ValueError:
-                    continue
-        
-        # 요약 추출
-        for pattern in summary_patterns:
-            matches = re.findall(pattern, response_text, re.IGNORECASE | re.DOTALL)
-            if matches:
-                summary = matches[0].strip()
-                # 너무 긴 요약은 잘라내기
+    
+    def _create_multi_block_content(self, chat_texts: List[str], filter_criteria: str) -> List[Dict[str, Any]]:
+        """여러 블록을 번호를 붙여 이어 붙인 API 요청용 content 블록 생성"""
+        blocks_text = "\n\n".join(f"=== 블록 {n} ===\n{chat_text}"
+                                  for n, chat_text in enumerate(chat_texts, 1))
+        return [
+            {"type": "text", "text": self._get_multi_prompt_prefix(filter_criteria),
+             "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": blocks_text}
+        ]
+    
+    def _extract_multi_scores(self, response_text: str, block_count: int) -> List[Optional[Tuple[float, str]]]:
+        """다중 블록 응답에서 블록별 (점수, 요약) 추출 (응답에 없는 블록은 None)"""
+        parsed = [None] * block_count
+        for number, score, summary in _MULTI_SCORE_RE.findall(response_text):
+            n = int(number) - 1
+            if 0 <= n < block_count and parsed[n] is None:
                 if len(summary) > 100:
                     summary = summary[:97] + "..."
-                break
+                parsed[n] = (max(0.0, min(100.0, float(score))), summary or "분석 요약 없음")
+        return parsed
+    
+    def _extract_score_and_summary(self, response_text: str) -> tuple[float, str]:
+        """Claude 응답에서 점수와 요약 추출"""
+        # 프롬프트가 지정한 "점수: N\n요약: ..." 형식이면 정규식 없이 바로 추출
+        parsed = self._parse_standard_response(response_text)
+        if parsed is not None:
+            score, summary = parsed
+        else:
+            score = self._match_score(response_text)
+            summary = "분석 불가"
+            
+            # 요약 추출
+            for pattern in _SUMMARY_PATTERNS:
+                match = pattern.search(response_text)
+                if match:
+                    summary = match.group(1).strip()
+                    break
+        
+        # 너무 긴 요약은 잘라내기
+        if len(summary) > 100:
+            summary = summary[:97] + "..."
         
         # 요약이 너무 짧거나 의미없으면 기본값
         if len(summary) < 5 or summary.lower() in ['none', 'n/a', '-']:
@@ -314,13 +860,72 @@ class OptimizedClaudeClient:
         
         return score, summary
     
+    def _parse_standard_response(self, response_text: str) -> Optional[Tuple[float, str]]:
+        """
+        "점수: N\n요약: 내용" 형식 응답을 문자열 연산만으로 파싱
+        
+        Returns:
+            (점수, 요약) 튜플, 형식이 다르면 None (정규식 경로로 처리)
+        """
+        if not response_text.startswith('점수:'):
+            return None
+        
+        newline = response_text.find('\n')
+        if newline < 0:
+            return None
+        digits = response_text[3:newline].strip()
+        if not (digits.isascii() and digits.isdigit()):
+            return None
+        
+        # 요약 줄이 비었거나 ':'로 시작하는 경우는 정규식 결과와 달라질 수 있어 제외
+        summary_line = response_text[newline + 1:].split('\n', 1)[0]
+        if not summary_line.startswith('요약:'):
+            return None
+        summary = summary_line[3:].strip()
+        if not summary or summary.startswith(':'):
+            return None
+        
+        return max(0.0, min(100.0, float(digits))), summary
+    
+    def _match_score(self, response_text: str) -> float:
+        """점수 패턴을 순서대로 시도하여 점수 추출 ("점수:" 표시 우선, 마지막에 첫 번째 숫자, 없으면 0)"""
+        for pattern in _SCORE_PATTERNS:
+            match = pattern.search(response_text)
+            if match:
+                try:
+                    return max(0.0, min(100.0, float(match.group(1))))
+                except ValueError:
+                    continue
+        return 0.0
+    
     def _extract_score(self, response_text: str) -> float:
-        """하위 호환성을 위한 기존 함수 (점수만 추출)"""
-        score, _ = self._extract_score_and_summary(response_text)
-        return score
+        """하위 호환성을 위한 기존 함수 (점수만 추출, 요약 추출은 생략)"""
+        parsed = self._parse_standard_response(response_text)
+        if parsed is not None:
+            return parsed[0]
+        return self._match_score(response_text)
+    
+    def _is_rate_limited(self, error: Exception) -> bool:
+        """429(사용량 한도 초과) 에러 여부 (SDK 예외는 상태 코드로, 그 외 예외는 메시지로 판별)"""
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            return status_code == 429
+        
+        error_str = str(error)
+        return "429" in error_str or "rate_limit_exceeded" in error_str.lower()
     
     def _format_error_message(self, error: Exception) -> str:
         """에러 메시지를 사용자 친화적으로 포맷팅"""
+        # SDK 예외는 상태 코드/예외 타입으로 바로 분류
+        status_code = getattr(error, "status_code", None)
+        if status_code in self.ERROR_MESSAGES:
+            return self.ERROR_MESSAGES[status_code]
+        
+        from anthropic import APIConnectionError
+        if isinstance(error, APIConnectionError):
+            return "🌐 네트워크 연결 문제"
+        
+        # 그 외 예외는 메시지 내용으로 분류
         error_str = str(error)
         
         # 429 Rate Limit 에러
@@ -357,10 +962,23 @@ class OptimizedClaudeClient:
         
         return f"🔧 API 오류: {error_str}"
     
-    def _calculate_cost(self, input_tokens: int, output_tokens: int) -> Dict[str, Any]:
-        """토큰 사용량을 기반으로 비용 계산"""
+    @staticmethod
+    def _usage_tokens(response) -> Tuple[int, int, int, int]:
+        """응답의 (입력, 출력, 캐시 읽기, 캐시 쓰기) 토큰 수 (캐시 필드가 없거나 None이면 0)"""
+        usage = response.usage
+        return (usage.input_tokens, usage.output_tokens,
+                getattr(usage, "cache_read_input_tokens", None) or 0,
+                getattr(usage, "cache_creation_input_tokens", None) or 0)
+    
+    def _calculate_cost(self, input_tokens: int, output_tokens: int, batch: bool = False,
+                        cache_read_tokens: int = 0, cache_write_tokens: int = 0) -> Dict[str, Any]:
+        """
+        토큰 사용량을 기반으로 비용 계산 (batch면 배치 API 할인 적용)
+        
+        input_tokens는 캐시되지 않은 입력만 포함하므로 캐시 읽기/쓰기 토큰은 배율을 적용해 입력 비용에 더함
+        """
         if self.model not in self.MODEL_PRICING:
-            return {
+            cost_info = {
                 "request_cost": 0.0,
                 "input_tokens": input_tokens,
                 "output_tokens": output_tokens,
@@ -368,54 +986,67 @@ class OptimizedClaudeClient:
                 "output_cost": 0.0,
                 "model": self.model
             }
+        else:
+            pricing = self.MODEL_PRICING[self.model]
+            discount = self.BATCH_DISCOUNT if batch else 1.0
+            billed_input_tokens = (input_tokens + cache_read_tokens * self.CACHE_READ_RATE
+                                   + cache_write_tokens * self.CACHE_WRITE_RATE)
+            input_cost = (billed_input_tokens / 1000) * pricing["input"] * discount
+            output_cost = (output_tokens / 1000) * pricing["output"] * discount
+            total_cost = input_cost + output_cost
+            
+            cost_info = {
+                "request_cost": total_cost,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "input_cost": input_cost,
+                "output_cost": output_cost,
+                "model": self.model
+            }
         
-        pricing = self.MODEL_PRICING[self.model]
-        input_cost = (input_tokens / 1000) * pricing["input"]
-        output_cost = (output_tokens / 1000) * pricing["output"]
-        total_cost = input_cost + output_cost
-        
-        return {
-            "request_cost": total_cost,
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "input_cost": input_cost,
-            "output_cost": output_cost,
-            "model": self.model
-        }
+        # 프롬프트 캐시가 동작한 요청만 캐시 토큰 수를 기록
+        if cache_read_tokens or cache_write_tokens:
+            cost_info["cache_read_tokens"] = cache_read_tokens
+            cost_info["cache_write_tokens"] = cache_write_tokens
+        return cost_info
     
     def _update_usage_stats(self, input_tokens: int, output_tokens: int, 
-                          cost: float, request_time: float):
-        """사용량 통계 업데이트 (스레드 안전)"""
-        with self.stats_lock:
-            self.total_input_tokens += input_tokens
-            self.total_output_tokens += output_tokens
-            self.total_cost += cost
-            self.request_count += 1
+                          cost: float, request_time: float = None, cache_read_tokens: int = 0):
+        """사용량 통계 업데이트 (배치 결과는 요청 시간 없음)"""
+        self.total_input_tokens += input_tokens
+        self.total_output_tokens += output_tokens
+        self.total_cache_read_tokens += cache_read_tokens
+        self.total_cost += cost
+        self.request_count += 1
+        if request_time is not None:
             self.request_times.append(request_time)
     
     def get_performance_summary(self) -> Dict[str, Any]:
         """성능 요약 정보 반환"""
-        with self.stats_lock:
-            total_time = time.time() - self.start_time if self.start_time else 0
-            avg_request_time = sum(self.request_times) / len(self.request_times) if self.request_times else 0
-            requests_per_second = self.request_count / total_time if total_time > 0 else 0
-            
-            return {
-                "total_requests": self.request_count,
-                "failed_requests": self.failed_requests,
-                "rate_limit_errors": self.rate_limit_count,
-                "success_rate": (self.request_count - self.failed_requests) / max(1, self.request_count) * 100,
-                "total_time_seconds": total_time,
-                "average_request_time": avg_request_time,
-                "requests_per_second": requests_per_second,
-                "cache_hits": len(self.cache) if self.enable_cache else 0,
-                "total_input_tokens": self.total_input_tokens,
-                "total_output_tokens": self.total_output_tokens,
-                "total_cost_usd": self.total_cost,
-                "total_cost_krw": self.total_cost * 1350,
-                "model": self.model,
-                "max_workers": self.max_workers
-            }
+        total_time = time.time() - self.start_time if self.start_time else 0
+        avg_request_time = float(np.mean(self.request_times)) if len(self.request_times) else 0
+        requests_per_second = self.request_count / total_time if total_time > 0 else 0
+        
+        return {
+            "total_requests": self.request_count,
+            "failed_requests": self.failed_requests,
+            "rate_limit_errors": self.rate_limit_count,
+            "success_rate": (self.request_count - self.failed_requests) / max(1, self.request_count) * 100,
+            "total_time_seconds": total_time,
+            "average_request_time": avg_request_time,
+            "requests_per_second": requests_per_second,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / max(1, self.cache_hits + self.cache_misses) * 100,
+            "duplicate_blocks": self.duplicate_blocks,
+            "total_input_tokens": self.total_input_tokens,
+            "total_output_tokens": self.total_output_tokens,
+            "total_cache_read_tokens": self.total_cache_read_tokens,
+            "total_cost_usd": self.total_cost,
+            "total_cost_krw": self.total_cost * 1350,
+            "model": self.model,
+            "max_workers": self.max_workers
+        }
     
     def print_performance_summary(self):
         """성능 요약을 콘솔에 출력"""
@@ -434,8 +1065,13 @@ class OptimizedClaudeClient:
         print(f"평균 요청시간: {summary['average_request_time']:.2f}초")
         print(f"초당 요청수: {summary['requests_per_second']:.1f} req/s")
         if self.enable_cache:
-            print(f"캐시 항목: {summary['cache_hits']:,}개")
+            print(f"캐시 적중: {summary['cache_hits']:,}회 / 미스: {summary['cache_misses']:,}회 "
+                  f"(적중률 {summary['cache_hit_rate']:.1f}%)")
+        if summary['duplicate_blocks'] > 0:
+            print(f"중복 블록: {summary['duplicate_blocks']:,}개 (API 호출 생략)")
         print(f"총 토큰: {summary['total_input_tokens'] + summary['total_output_tokens']:,}개")
+        if summary['total_cache_read_tokens'] > 0:
+            print(f"프롬프트 캐시 읽기: {summary['total_cache_read_tokens']:,} 토큰 (입력 요금의 {self.CACHE_READ_RATE:.0%})")
         print(f"총 비용: ${summary['total_cost_usd']:.4f} (₩{summary['total_cost_krw']:.0f})")
         
         # 429 에러가 많으면 조언 제공
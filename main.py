@@ -7,7 +7,6 @@ CSV 파일의 채팅 데이터를 분석하여 사용자 정의 필터에 매칭
 import os
 import sys
 import click
-from chat_analyzer import ChatAnalyzer
 
 
 @click.group()
@@ -26,11 +25,20 @@ def cli():
 @click.option('--no-cache', is_flag=True, help='캐싱 비활성화')
 @click.option('--no-fast', is_flag=True, help='대용량 데이터 경고 비활성화')
 @click.option('--recent-days', '-d', type=int, help='최근 N일 이내 데이터만 분석')
+@click.option('--batch', is_flag=True, help='Message Batches API 사용 (50% 할인, 완료까지 최대 24시간)')
+@click.option('--rpm', default=50, help='분당 최대 요청 수 (기본값: 50)')
+@click.option('--tpm', default=80000, help='분당 최대 토큰 수 (기본값: 80000)')
+@click.option('--prefilter-cutoff', type=float, help='사전 필터 유사도 기준 (0~1, 미만 블록은 API 호출 없이 0점 처리)')
+@click.option('--blocks-per-request', default=1, help='한 번의 API 요청에 묶어 보낼 블록 수 (기본값: 1)')
+@click.option('--yes', '-y', is_flag=True, help='예상 비용과 관계없이 확인 없이 바로 분석')
+@click.option('--max-cost', default=1.0, help='예상 비용이 이 금액(USD) 이하면 확인 없이 바로 분석 (기본값: 1.0)')
 @click.option('--output', '-out', help='결과 저장 파일명')
-def analyze(csv_file, filter_criteria, window_size, overlap, model, workers, no_cache, no_fast, recent_days, output):
+def analyze(csv_file, filter_criteria, window_size, overlap, model, workers, no_cache, no_fast, recent_days, batch, rpm, tpm, prefilter_cutoff, blocks_per_request, yes, max_cost, output):
     """⚡ CSV 파일을 병렬 처리로 빠르게 분석합니다."""
     
-    # API 키 확인
+    # API 키 확인 (.env는 API 키를 쓰는 명령에서만 로드)
+    from dotenv import load_dotenv
+    load_dotenv()
     if not os.getenv('ANTHROPIC_API_KEY'):
         click.echo("❌ ANTHROPIC_API_KEY 환경 변수가 설정되지 않았습니다.")
         click.echo("💡 .env 파일에 API 키를 설정하거나 환경 변수로 설정해주세요.")
@@ -42,20 +50,27 @@ def analyze(csv_file, filter_criteria, window_size, overlap, model, workers, no_
         analyzer = ChatAnalyzer(
             model=model, 
             max_workers=workers, 
-            enable_cache=not no_cache
+            enable_cache=not no_cache,
+            rpm_limit=rpm,
+            tpm_limit=tpm,
+            prefilter_cutoff=prefilter_cutoff,
+            blocks_per_request=blocks_per_request
         )
         
         click.echo("🚀 분석을 시작합니다!")
         click.echo(f"🔧 설정: {workers}개 워커, 캐싱 {'OFF' if no_cache else 'ON'}, 대용량경고 {'OFF' if no_fast else 'ON'}")
         
         # 분석 실행
-        results = analyzer.analyze_csv_file(
+        analyze_fn = analyzer.analyze_csv_file_batch if batch else analyzer.analyze_csv_file
+        results = analyze_fn(
             csv_path=csv_file,
             filter_criteria=filter_criteria,
             window_size=window_size,
             overlap=overlap,
             fast_mode=not no_fast,
-            recent_days=recent_days
+            recent_days=recent_days,
+            auto_proceed=yes,
+            max_cost_usd=max_cost
         )
         
         if not results:
@@ -82,6 +97,7 @@ def search(result_file, threshold):
     
     try:
         # 분석기 초기화 및 결과 로드
+        from chat_analyzer import ChatAnalyzer
         analyzer = ChatAnalyzer()
         results = analyzer.load_results(result_file)
         
@@ -109,6 +125,7 @@ def stats(result_file):
     
     try:
         # 분석기 초기화 및 결과 로드
+        from chat_analyzer import ChatAnalyzer
         analyzer = ChatAnalyzer()
         results = analyzer.load_results(result_file)
         
@@ -116,10 +133,8 @@ def stats(result_file):
             click.echo("❌ 분석 결과를 로드할 수 없습니다.")
             sys.exit(1)
         
-        # 통계 출력 (이미 ChatAnalyzer에서 처리됨)
-        from data_manager import DataManager
-        data_manager = DataManager()
-        stats_info = data_manager.get_statistics(results)
+        # 통계 출력 (분석기가 가진 DataManager 재사용)
+        stats_info = analyzer.data_manager.get_statistics(results)
         
         click.echo(f"\n📊 분석 결과 통계")
         click.echo("=" * 50)
@@ -144,6 +159,7 @@ def detail(result_file, block_id):
     
     try:
         # 분석기 초기화 및 결과 로드
+        from chat_analyzer import ChatAnalyzer
         analyzer = ChatAnalyzer()
         results = analyzer.load_results(result_file)
         
@@ -196,18 +212,18 @@ def estimate(csv_file, filter_criteria, window_size, overlap, model, recent_days
         analyzer = ChatAnalyzer(model=model)
         
         # CSV 로드 및 블록 생성
-        chat_data = analyzer.data_manager.load_csv(csv_file, recent_days)
-        if not chat_data:
+        _, _, messages = analyzer.data_manager.load_csv(csv_file, recent_days)
+        if not messages:
             click.echo("❌ CSV 파일 로드 실패")
             sys.exit(1)
             
-        chat_blocks = analyzer.data_manager.create_sliding_windows(window_size, overlap)
-        if not chat_blocks:
+        windows = analyzer.data_manager.create_sliding_windows(window_size, overlap)
+        if not windows:
             click.echo("❌ 채팅 블록 생성 실패")
             sys.exit(1)
         
         # 비용 추정
-        estimated_cost = analyzer._estimate_cost_and_time(chat_blocks, filter_criteria)
+        estimated_cost = analyzer._estimate_cost_and_time(windows, filter_criteria)
         
         click.echo(f"\n💰 분석 비용 추정")
         click.echo("=" * 40)
@@ -232,12 +248,12 @@ def estimate(csv_file, filter_criteria, window_size, overlap, model, recent_days
 def pricing():
     """모델별 가격 정보를 출력합니다."""
     
-    from llm_client import OptimizedClaudeClient
+    from pricing import MODEL_PRICING
     
     click.echo("💰 Claude 모델별 가격 정보 (1K 토큰당)")
     click.echo("=" * 60)
     
-    for model, pricing in OptimizedClaudeClient.MODEL_PRICING.items():
+    for model, pricing in MODEL_PRICING.items():
         click.echo(f"\n🤖 {model}")
         click.echo(f"  입력: ${pricing['input']:.5f} (₩{pricing['input'] * 1350:.2f})")
         click.echo(f"  출력: ${pricing['output']:.5f} (₩{pricing['output'] * 1350:.2f})")
@@ -0,0 +1,97 @@
+"""
+채팅 블록 사전 필터링 모듈
+필터 조건과 관련 없는 블록을 API 호출 전에 로컬에서 걸러내기 위한
+문자 n-gram 해시 TF-IDF 코사인 유사도 계산
+"""
+
+import numpy as np
+from typing import List, Tuple
+
+
+class BlockPrefilter:
+    """문자 유니그램/바이그램 해시 TF-IDF로 필터 조건과 블록의 유사도를 계산하는 클래스"""
+    
+    # 해시 공간 크기 (n-gram 충돌을 줄이면서 쿼리 벡터를 밀집 배열로 유지)
+    N_FEATURES = 1 << 18
+    
+    # 바이그램 해시용 곱셈 상수
+    _BIGRAM_PRIME = np.uint64(1_000_003)
+    
+    # 필터 조건에 흔하지만 주제와 무관한 표현 (채팅 본문에는 잘 나오지 않아 유사도만 흐리므로 쿼리에서 제외)
+    QUERY_STOPWORDS = ("관련된", "관련", "대화", "내용", "이야기", "메시지", "채팅")
+    
+    def __init__(self, n_features: int = N_FEATURES):
+        """
+        사전 필터 초기화
+        
+        Args:
+            n_features: 해시 특징 공간 크기
+        """
+        self.n_features = n_features
+    
+    def _hash_ngrams(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """텍스트의 문자 유니그램/바이그램을 해시 특징 번호로 변환 (공백 포함 n-gram 제외)"""
+        codepoints = np.frombuffer(text.lower().encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        if codepoints.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        # 공백/구두점 등 비문자는 n-gram에서 제외 (한글·영문·숫자만 사용)
+        unique_codepoints, inverse = np.unique(codepoints, return_inverse=True)
+        is_word = np.array([chr(c).isalnum() for c in unique_codepoints.tolist()], dtype=np.bool_)
+        word_mask = is_word[inverse]
+        
+        unigrams = codepoints[word_mask]
+        bigram_mask = word_mask[:-1] & word_mask[1:]
+        bigrams = (codepoints[:-1][bigram_mask] * self._BIGRAM_PRIME) ^ codepoints[1:][bigram_mask]
+        
+        # 유니그램과 바이그램이 같은 번호에 몰리지 않도록 바이그램에 오프셋 부여
+        features = np.concatenate((unigrams, bigrams + np.uint64(0x9E3779B9)))
+        ids, counts = np.unique((features % np.uint64(self.n_features)).astype(np.int64), return_counts=True)
+        
+        # 로그 스케일 TF (긴 블록의 반복 단어 영향 완화)
+        return ids, 1.0 + np.log(counts)
+    
+    def _strip_stopwords(self, filter_criteria: str) -> str:
+        """필터 조건에서 QUERY_STOPWORDS 제거 (남는 글자가 없으면 원래 조건 사용)"""
+        stripped = filter_criteria
+        for word in self.QUERY_STOPWORDS:
+            stripped = stripped.replace(word, " ")
+        return stripped if any(c.isalnum() for c in stripped) else filter_criteria
+    
+    def similarities(self, filter_criteria: str, texts: List[str]) -> np.ndarray:
+        """
+        필터 조건과 각 블록 텍스트의 코사인 유사도 계산
+        
+        Args:
+            filter_criteria: 필터 조건
+            texts: 블록 텍스트 리스트
+        
+        Returns:
+            블록 순서대로의 유사도 배열 (0~1)
+        """
+        docs = [self._hash_ngrams(text) for text in texts]
+        if not docs:
+            return np.empty(0, dtype=np.float64)
+        
+        # 블록 집합 기준 문서 빈도로 IDF 계산 (모든 블록에 흔한 n-gram의 가중치를 낮춤)
+        doc_freq = np.bincount(np.concatenate([ids for ids, _ in docs]), minlength=self.n_features)
+        idf = np.log((1 + len(docs)) / (1 + doc_freq)) + 1.0
+        
+        query_ids, query_tf = self._hash_ngrams(self._strip_stopwords(filter_criteria))
+        query = np.zeros(self.n_features, dtype=np.float64)
+        query[query_ids] = query_tf * idf[query_ids]
+        query_norm = np.linalg.norm(query)
+        
+        sims = np.zeros(len(docs), dtype=np.float64)
+        if query_norm == 0:
+            return sims
+        
+        for i, (ids, tf) in enumerate(docs):
+            if ids.size == 0:
+                continue
+            weights = tf * idf[ids]
+            norm = np.linalg.norm(weights)
+            if norm > 0:
+                sims[i] = (weights @ query[ids]) / (norm * query_norm)
+        
+        return sims
@@ -0,0 +1,13 @@
+"""
+Claude 모델 가격 정보 모듈
+Anthropic SDK를 불러오지 않고도 가격을 조회할 수 있도록 클라이언트 모듈과 분리
+"""
+
+# 모델별 가격 정보 (1K 토큰당 USD)
+MODEL_PRICING = {
+    "claude-3-haiku-20240307": {"input": 0.00025, "output": 0.00125},
+    "claude-3-sonnet-20240229": {"input": 0.003, "output": 0.015},
+    "claude-3-opus-20240229": {"input": 0.015, "output": 0.075},
+    "claude-3-5-sonnet-20240620": {"input": 0.003, "output": 0.015},
+    "claude-3-5-haiku-20241022": {"input": 0.001, "output": 0.005}
+}
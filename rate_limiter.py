@@ -0,0 +1,128 @@
+"""
+API 사용량 제한(RPM/TPM) 대응 모듈
+슬라이딩 윈도우 토큰 버킷 + AIMD 동시성 제어로 429 에러 없이 한도 근처에서 처리
+"""
+
+import time
+import asyncio
+from collections import deque
+
+
+class RateLimiter:
+    """RPM/TPM 슬라이딩 윈도우와 AIMD 동시성 제어를 결합한 비동기 레이트 리미터"""
+    
+    # Anthropic 기본 프로파일 (Tier 1 기준)
+    DEFAULT_RPM = 50
+    DEFAULT_TPM = 80_000
+    DEFAULT_MAX_CONCURRENCY = 5
+    
+    WINDOW_SECONDS = 60.0
+    
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 increase_step: float = 1.0, decrease_factor: float = 0.5):
+        """
+        레이트 리미터 초기화
+        
+        Args:
+            rpm: 분당 최대 요청 수
+            tpm: 분당 최대 토큰 수
+            max_concurrency: 최대 동시 요청 수
+            increase_step: 성공 시 가산 증가량 (α, 동시성 1단위당)
+            decrease_factor: 429 발생 시 곱셈 감소 비율 (β)
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        
+        # 현재 허용 동시성 (AIMD로 조정)
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        
+        # 최근 60초 요청 기록: (시각, 토큰 수)
+        self._window = deque()
+        self._window_tokens = 0
+        
+        # 이벤트 루프에 바인딩되므로 첫 acquire 시점에 생성
+        self._lock = None
+        self._slot_freed = None
+    
+    async def acquire(self, tokens: int = 0):
+        """
+        요청 전송 전 호출 - RPM/TPM/동시성 한도 내에 들어올 때까지 대기
+        
+        Args:
+            tokens: 이번 요청의 예상 토큰 수 (입력 + 출력)
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slot_freed = asyncio.Event()
+        
+        # 락을 잡은 순서대로(FIFO) 슬롯을 배정
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._evict_expired(now)
+                
+                if self.in_flight >= int(self.concurrency):
+                    self._slot_freed.clear()
+                    await self._slot_freed.wait()
+                    continue
+                
+                wait_time = self._window_wait_time(now, tokens)
+                if wait_time <= 0:
+                    break
+                await asyncio.sleep(wait_time)
+            
+            self._window.append((now, tokens))
+            self._window_tokens += tokens
+            self.in_flight += 1
+    
+    def release(self, rate_limited: bool = False):
+        """
+        요청 완료 후 호출 - 결과에 따라 허용 동시성을 AIMD로 조정
+        
+        Args:
+            rate_limited: 429(사용량 한도 초과) 응답 여부
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        
+        if rate_limited:
+            # 곱셈 감소: 한도 초과 시 동시성을 즉시 줄임
+            self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+        else:
+            # 가산 증가: 윈도우 하나(현재 동시성만큼의 성공)마다 +α
+            self.concurrency = min(float(self.max_concurrency),
+                                   self.concurrency + self.increase_step / self.concurrency)
+        
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+    
+    def _evict_expired(self, now: float):
+        """60초가 지난 요청 기록 제거"""
+        while self._window and now - self._window[0][0] >= self.WINDOW_SECONDS:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+    
+    def _window_wait_time(self, now: float, tokens: int) -> float:
+        """RPM/TPM 한도 내로 들어오기까지 남은 대기 시간 (0 이하면 즉시 전송 가능)"""
+        if not self._window:
+            # 단일 요청이 TPM보다 커도 빈 윈도우에서는 허용 (교착 방지)
+            return 0.0
+        
+        if len(self._window) >= self.rpm:
+            return self._window[0][0] + self.WINDOW_SECONDS - now
+        
+        if self._window_tokens + tokens > self.tpm:
+            # 오래된 기록부터 만료시켜 토큰 여유가 생기는 시점 계산
+            freed = 0
+            excess = self._window_tokens + tokens - self.tpm
+            for timestamp, request_tokens in self._window:
+                freed += request_tokens
+                if freed >= excess:
+                    return timestamp + self.WINDOW_SECONDS - now
+            return self._window[-1][0] + self.WINDOW_SECONDS - now
+        
+        return 0.0
@@ -0,0 +1,116 @@
+"""
+분석 결과 영구 캐시 모듈
+채팅 블록 내용 해시를 키로 SQLite에 저장하여 재실행/중복 블록의 API 호출 방지
+"""
+
+import json
+import sqlite3
+import threading
+import weakref
+try:
+    import orjson
+except ImportError:  # orjson 미설치 시 표준 json 사용
+    orjson = None
+from typing import Dict, Any, Tuple, Optional
+
+
+class ResultCache:
+    """(매칭률, 비용정보) 결과를 SQLite 파일에 저장하는 디스크 캐시"""
+    
+    DEFAULT_PATH = ".chat_analysis_cache.sqlite3"
+    
+    # 최대 항목 수 (열 때 초과분을 오래 전에 저장된 항목부터 삭제)
+    DEFAULT_MAX_ENTRIES = 200_000
+    
+    # 쓰기를 이만큼 모아서 한 번에 커밋 (매 저장마다 커밋하지 않음)
+    COMMIT_INTERVAL = 100
+    
+    def __init__(self, db_path: str = DEFAULT_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        디스크 캐시 초기화
+        
+        Args:
+            db_path: SQLite 파일 경로
+            max_entries: 최대 항목 수 (None이면 제한 없음)
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._pending_writes = 0
+        
+        # 동기 API(analyze_chat_text)는 호출자의 여러 스레드에서 쓰일 수 있으므로 스레드 검사를 끄고 락으로 직렬화
+        # (비동기 분석은 이벤트 루프 스레드 하나에서만 호출하므로 락 경합 없음)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, match_rate REAL NOT NULL, cost_info TEXT NOT NULL)"
+        )
+        self._prune()
+        self.conn.commit()
+        
+        # 커밋하지 않은 쓰기는 객체가 정리되거나 프로세스가 끝날 때 반영
+        self._finalizer = weakref.finalize(self, self._close_connection, self.conn, self.lock)
+    
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """캐시된 결과 조회 (없으면 None)"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT match_rate, cost_info FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        return row[0], (orjson.loads if orjson is not None else json.loads)(row[1])
+    
+    def set(self, key: str, result: Tuple[float, Dict[str, Any]]):
+        """결과 저장 (같은 키는 덮어씀, COMMIT_INTERVAL개마다 커밋)"""
+        match_rate, cost_info = result
+        if orjson is not None:
+            cost_info_json = orjson.dumps(cost_info).decode('utf-8')
+        else:
+            cost_info_json = json.dumps(cost_info, ensure_ascii=False)
+        
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, match_rate, cost_info) VALUES (?, ?, ?)",
+                (key, match_rate, cost_info_json)
+            )
+            self._pending_writes += 1
+            if self._pending_writes >= self.COMMIT_INTERVAL:
+                self.conn.commit()
+                self._pending_writes = 0
+    
+    def flush(self):
+        """아직 커밋하지 않은 쓰기 반영 (분석이 끝날 때 호출)"""
+        with self.lock:
+            if self._pending_writes:
+                self.conn.commit()
+                self._pending_writes = 0
+    
+    def _prune(self):
+        """max_entries를 넘는 항목을 오래 전에 저장된 것부터 삭제 (INSERT OR REPLACE는 새 rowid를 받으므로 rowid가 저장 순서)"""
+        if self.max_entries is None:
+            return
+        count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY rowid LIMIT ?)",
+                (count - self.max_entries,)
+            )
+    
+    @staticmethod
+    def _close_connection(conn: sqlite3.Connection, lock: threading.Lock):
+        """남은 쓰기를 커밋하고 연결 종료"""
+        with lock:
+            conn.commit()
+            conn.close()
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    
+    def close(self):
+        """남은 쓰기를 커밋하고 DB 연결 종료"""
+        self._finalizer()
@@ -0,0 +1,95 @@
+"""
+체크포인트 이어받기 테스트
+필터링된 행이 바뀌어 윈도우가 밀려도 저장된 점수가 다른 블록에 붙지 않는지 확인
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from chat_analyzer import ChatAnalyzer
+
+MESSAGE_COUNT = 40
+WINDOW_SIZE = 10
+OVERLAP = 5
+
+
+def _fake_score(text: str) -> int:
+    """블록 내용마다 다른 결정적 점수"""
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest(), 16) % 101
+
+
+class TestCheckpointResume(unittest.TestCase):
+    """내용 키 기반 체크포인트 복원"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.checkpoint_path = os.path.join(self.tmp_dir, "checkpoint.jsonl")
+        self.env = mock.patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_csv(self, first_message: int) -> str:
+        """first_message번째 메시지부터 남긴 CSV (앞쪽 메시지가 최근 N일 필터로 빠진 상황)"""
+        csv_path = os.path.join(self.tmp_dir, f"chat_{first_message}.csv")
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("Date,User,Message\n")
+            for i in range(first_message, MESSAGE_COUNT):
+                f.write(f"2024-06-{i + 1:02d} 10:00,user{i % 3},메시지 {i}\n")
+        return csv_path
+
+    def _analyze(self, csv_path: str, checkpoint_path: str = None):
+        """가짜 API 응답으로 분석하고 (결과, API 호출 수) 반환"""
+        analyzer = ChatAnalyzer(max_workers=2, enable_cache=False)
+        analyzer.data_manager.load_csv(csv_path)
+        windows = analyzer.data_manager.create_sliding_windows(WINDOW_SIZE, OVERLAP)
+        client = analyzer.claude_client
+        calls = []
+
+        async def fake_create_message(content, max_tokens, rate_limiter=None, estimated_tokens=0):
+            text = "".join(block["text"] for block in content)
+            calls.append(text)
+            score = _fake_score(text)
+            usage = types.SimpleNamespace(input_tokens=10, output_tokens=5)
+            response = types.SimpleNamespace(usage=usage, content=[
+                types.SimpleNamespace(text=f"점수: {score}\n요약: 블록 {score}")
+            ])
+            return response, 0.0
+
+        client._acreate_message = fake_create_message
+        results = asyncio.run(analyzer._analyze_async(windows, "테스트 조건", checkpoint_path=checkpoint_path))
+        return [match_rate for match_rate, _ in results], len(calls)
+
+    def test_shifted_windows_are_reanalyzed(self):
+        self._analyze(self._write_csv(0), self.checkpoint_path)
+
+        # 메시지 하나가 빠지면 모든 윈도우 내용이 바뀌므로 저장된 점수를 쓰지 않아야 함
+        shifted_csv = self._write_csv(1)
+        expected, expected_calls = self._analyze(shifted_csv)
+        resumed, resumed_calls = self._analyze(shifted_csv, self.checkpoint_path)
+        self.assertGreater(expected_calls, 0)
+        self.assertEqual(resumed, expected)
+        self.assertEqual(resumed_calls, expected_calls)
+
+    def test_matching_windows_are_reused(self):
+        self._analyze(self._write_csv(0), self.checkpoint_path)
+
+        # 윈도우 간격만큼 빠지면 윈도우 경계가 이전과 맞으므로 모든 블록을 API 호출 없이 복원
+        shifted_csv = self._write_csv(WINDOW_SIZE - OVERLAP)
+        expected, expected_calls = self._analyze(shifted_csv)
+        resumed, resumed_calls = self._analyze(shifted_csv, self.checkpoint_path)
+        self.assertEqual(resumed, expected)
+        self.assertGreater(expected_calls, 0)
+        self.assertEqual(resumed_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
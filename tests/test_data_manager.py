@@ -0,0 +1,75 @@
+"""
+DataManager CSV 로드 테스트
+pyarrow 리더와 pandas C 엔진이 같은 행/값을 돌려주는지 확인
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import data_manager
+from data_manager import DataManager
+
+# 결측값 토큰이 섞인 채팅 CSV (메시지가 결측값이면 제거, 사용자/날짜가 결측값이면 'nan')
+NA_TOKEN_CSV = """Date,User,Message
+2024-06-23 10:00,kim,안녕
+2024-06-23 10:01,park,nan
+2024-06-23 10:02,choi,None
+2024-06-23 10:03,lee,NA
+2024-06-23 10:04,kang,"null"
+2024-06-23 10:05,yoon,N/A
+2024-06-23 10:06,jung,<NA>
+2024-06-23 10:07,han,#N/A
+2024-06-23 10:08,NA,사용자 없음
+NaN,kim,날짜 없음
+2024-06-23 10:09,,빈 사용자
+2024-06-23 10:10,park,
+2024-06-23 10:11,choi,"   "
+2024-06-23 10:12,lee,  n/a
+2024-06-23 10:13,kang,NULLX
+"""
+
+
+class TestReadChatCsv(unittest.TestCase):
+    """CSV 리더 엔진별 결과 비교"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmp_dir, "chat.csv")
+        with open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write(NA_TOKEN_CSV)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _load(self, use_pyarrow: bool):
+        """Parquet 캐시 없이 지정한 엔진으로 CSV 로드"""
+        parquet_path = self.csv_path + '.parquet'
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path)
+
+        manager = DataManager()
+        if use_pyarrow:
+            return manager.load_csv(self.csv_path)
+        with mock.patch.object(data_manager, 'pa', None):
+            return manager.load_csv(self.csv_path)
+
+    def test_c_engine_drops_na_token_messages(self):
+        dates, users, messages = self._load(use_pyarrow=False)
+        self.assertEqual(messages, ['안녕', '사용자 없음', '날짜 없음', '빈 사용자', 'n/a', 'NULLX'])
+        self.assertEqual(users, ['kim', 'nan', 'kim', 'nan', 'lee', 'kang'])
+        self.assertEqual(dates[2], 'nan')
+
+    @unittest.skipIf(data_manager.pa is None, "pyarrow 미설치")
+    def test_pyarrow_matches_c_engine(self):
+        self.assertEqual(self._load(use_pyarrow=True), self._load(use_pyarrow=False))
+
+    def test_na_values_match_pandas_defaults(self):
+        from pandas._libs.parsers import STR_NA_VALUES
+        self.assertEqual(set(DataManager.NA_VALUES), set(STR_NA_VALUES))
+
+
+if __name__ == '__main__':
+    unittest.main()
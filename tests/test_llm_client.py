@@ -0,0 +1,94 @@
+"""
+OptimizedClaudeClient 테스트
+API 호출 없이 가짜 응답으로 동기 API와 응답 파싱을 확인
+"""
+
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from llm_client import OptimizedClaudeClient
+
+
+def _fake_response(score: int):
+    """점수 한 줄짜리 가짜 API 응답"""
+    usage = types.SimpleNamespace(input_tokens=10, output_tokens=5)
+    return types.SimpleNamespace(usage=usage, content=[
+        types.SimpleNamespace(text=f"점수: {score}\n요약: 테스트")
+    ])
+
+
+class TestSyncApiThreads(unittest.TestCase):
+    """동기 API를 여러 스레드에서 호출"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_calculate_filter_match_rate_single_from_thread_pool(self):
+        client = OptimizedClaudeClient(cache_path=os.path.join(self.tmp_dir, "cache.sqlite3"))
+        client.sync_scoring_client = types.SimpleNamespace(messages=types.SimpleNamespace(
+            create=lambda **kwargs: _fake_response(42)
+        ))
+
+        # 같은 내용의 블록이 섞여 있어 디스크/메모리 캐시 조회와 저장이 여러 스레드에서 일어남
+        blocks = [[{"user": "kim", "message": f"메시지 {i % 16}"}] for i in range(64)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda block: client.calculate_filter_match_rate_single(block, "조건"), blocks
+            ))
+
+        self.assertTrue(all(match_rate == 42 for match_rate, _ in results))
+        self.assertEqual(client.failed_requests, 0)
+        self.assertEqual(client.request_count + client.cache_hits, len(blocks))
+        self.assertEqual(client.total_input_tokens, client.request_count * 10)
+        self.assertEqual(len(client.disk_cache), 16)
+        client.disk_cache.close()
+
+
+class TestExtractScore(unittest.TestCase):
+    """응답 텍스트에서 점수 추출"""
+
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}):
+            self.client = OptimizedClaudeClient(enable_cache=False)
+
+    def test_score_label_wins_over_earlier_number(self):
+        response = "3개 메시지 중 2개가 일정 이야기입니다.\n점수: 80"
+        self.assertEqual(self.client._extract_score(response), 80.0)
+        self.assertEqual(self.client._extract_score_and_summary(response)[0], 80.0)
+
+    def test_standard_format(self):
+        self.assertEqual(self.client._extract_score("점수: 67\n요약: 일정 논의"), 67.0)
+
+    def test_fallback_patterns(self):
+        self.assertEqual(self.client._extract_score("관련도 10개 중 75점"), 75.0)
+        self.assertEqual(self.client._extract_score("약 5명이 참여, score: 30"), 30.0)
+        self.assertEqual(self.client._extract_score("150"), 100.0)
+        self.assertEqual(self.client._extract_score("숫자 없음"), 0.0)
+
+
+class TestCacheKey(unittest.TestCase):
+    """디스크 캐시 키"""
+
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}):
+            self.client = OptimizedClaudeClient(enable_cache=False)
+
+    def test_prompt_version_changes_key(self):
+        key = self.client._generate_cache_key("블록", "조건")
+        self.client.PROMPT_VERSION += 1
+        self.assertNotEqual(self.client._generate_cache_key("블록", "조건"), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
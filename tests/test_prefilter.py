@@ -0,0 +1,71 @@
+"""
+사전 필터 테스트
+짧은 한국어 필터 조건에서 주제어가 나오는 블록의 유사도가 0이 되지 않는지,
+기준을 넘는 블록이 없을 때 모든 블록을 분석하는지 확인
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from chat_analyzer import ChatAnalyzer
+from prefilter import BlockPrefilter
+
+BLOCKS = [
+    "김철수: 오늘 배포 일정 공유드립니다\n이영희: 배포는 몇 시에 하나요?",
+    "김철수: 점심 뭐 먹을까\n이영희: 국수 어때요",
+    "박민수: 주말에 등산 가실 분\n김철수: 저요",
+]
+
+
+class TestBlockPrefilter(unittest.TestCase):
+    """필터 조건과 블록의 문자 n-gram 유사도"""
+
+    def test_short_korean_criteria_matches_topic_block(self):
+        sims = BlockPrefilter().similarities("배포 관련 대화", BLOCKS)
+        self.assertGreater(sims[0], 0.05)
+        self.assertEqual(sims[1], 0.0)
+        self.assertEqual(sims[2], 0.0)
+
+    def test_stopword_only_criteria_kept(self):
+        # 조건이 제외 표현뿐이면 원래 조건으로 계산
+        self.assertEqual(BlockPrefilter()._strip_stopwords("대화"), "대화")
+
+
+class TestPrefilterWindows(unittest.TestCase):
+    """ChatAnalyzer 사전 필터 적용"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"})
+        self.env.start()
+
+        csv_path = os.path.join(self.tmp_dir, "chat.csv")
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("Date,User,Message\n")
+            for i in range(30):
+                message = "배포 일정 공유합니다" if i < 10 else f"점심 메뉴 {i}"
+                f.write(f"2024-06-01 10:{i:02d},user{i % 3},{message}\n")
+
+        self.analyzer = ChatAnalyzer(enable_cache=False, prefilter_cutoff=0.05)
+        self.analyzer.data_manager.load_csv(csv_path)
+        self.windows = self.analyzer.data_manager.create_sliding_windows(10, 5)
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_unrelated_windows_skipped(self):
+        skipped = self.analyzer._prefilter_windows(self.windows, "배포 관련 대화")
+        self.assertTrue(skipped)
+        self.assertLess(len(skipped), len(self.windows))
+        self.assertNotIn(0, skipped)
+
+    def test_no_window_above_cutoff_sends_everything(self):
+        self.assertEqual(self.analyzer._prefilter_windows(self.windows, "환불 요청 대화"), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+ResultCache 테스트
+항목 수 제한, 모아서 커밋한 쓰기의 영속성 확인
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    """SQLite 디스크 캐시"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "cache.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fill(self, cache: ResultCache, count: int):
+        for i in range(count):
+            cache.set(f"key{i}", (float(i), {"summary": f"블록 {i}"}))
+
+    def test_pending_writes_survive_close(self):
+        cache = ResultCache(self.db_path)
+        self._fill(cache, 5)  # COMMIT_INTERVAL보다 적어 아직 커밋 전
+        cache.close()
+
+        reopened = ResultCache(self.db_path)
+        self.assertEqual(len(reopened), 5)
+        self.assertEqual(reopened.get("key3"), (3.0, {"summary": "블록 3"}))
+        reopened.close()
+
+    def test_flush_is_visible_to_other_connections(self):
+        cache = ResultCache(self.db_path)
+        self._fill(cache, 5)
+        cache.flush()
+
+        other = ResultCache(self.db_path)
+        self.assertEqual(len(other), 5)
+        other.close()
+        cache.close()
+
+    def test_oldest_entries_pruned_on_open(self):
+        cache = ResultCache(self.db_path, max_entries=None)
+        self._fill(cache, 30)
+        cache.close()
+
+        pruned = ResultCache(self.db_path, max_entries=10)
+        self.assertEqual(len(pruned), 10)
+        self.assertIsNone(pruned.get("key19"))
+        self.assertEqual(pruned.get("key20")[0], 20.0)
+        pruned.close()
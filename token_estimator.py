@@ -0,0 +1,78 @@
+"""
+프롬프트 토큰 수 추정 모듈
+비용 추정과 TPM 레이트 리미트 계산에 쓰는 한국어/영어 혼재 텍스트의 근사 토큰 수
+"""
+
+import numpy as np
+try:
+    from numba import njit
+except ImportError:  # numba 미설치 시 NumPy 벡터 연산으로 대체
+    njit = None
+
+# str.split()이 구분자로 쓰는 공백 코드포인트 (U+3000 이하에 모두 포함)
+_WHITESPACE_CODEPOINTS = np.array([c for c in range(0x3001) if chr(c).isspace()], dtype=np.uint32)
+_IS_WHITESPACE = np.zeros(0x3001, dtype=np.bool_)
+_IS_WHITESPACE[_WHITESPACE_CODEPOINTS] = True
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _count_tokens_jit(codepoints, is_whitespace):
+        """코드포인트 배열을 한 번 순회하며 (한국어 글자 수, 영어 단어 수, 영어 단어 글자 수) 계산"""
+        korean_chars = 0
+        english_words = 0
+        english_chars = 0
+        word_length = 0
+        word_is_alpha = True
+        
+        for c in codepoints:
+            if c <= 0x3000 and is_whitespace[c]:
+                if word_length > 0 and word_is_alpha:
+                    english_words += 1
+                    english_chars += word_length
+                word_length = 0
+                word_is_alpha = True
+                continue
+            
+            if 0xAC00 <= c <= 0xD7AF:
+                korean_chars += 1
+            if not ((65 <= c <= 90) or (97 <= c <= 122)):
+                word_is_alpha = False
+            word_length += 1
+        
+        if word_length > 0 and word_is_alpha:
+            english_words += 1
+            english_chars += word_length
+        
+        return korean_chars, english_words, english_chars
+
+
+def estimate_prompt_tokens(prompt: str) -> int:
+    """
+    프롬프트 토큰 수 추정 (한국어와 영어 혼재 고려)
+    한국어: 글자당 1.5토큰, 영어: 단어당 1.3토큰, 공백/기호: 0.5토큰
+    Numba가 설치되어 있으면 JIT 컴파일된 단일 루프, 없으면 NumPy 벡터 연산 사용
+    """
+    codepoints = np.frombuffer(prompt.encode('utf-32-le'), dtype=np.uint32)
+    if codepoints.size == 0:
+        return 0
+    
+    if njit is not None:
+        korean_chars, english_words, english_chars = _count_tokens_jit(codepoints, _IS_WHITESPACE)
+        other_chars = codepoints.size - korean_chars - english_chars
+        return int(korean_chars * 1.5 + english_words * 1.3 + other_chars * 0.5)
+    
+    korean_chars = int(((codepoints >= 0xAC00) & (codepoints <= 0xD7AF)).sum())
+    is_alpha = ((codepoints >= 65) & (codepoints <= 90)) | ((codepoints >= 97) & (codepoints <= 122))
+    in_word = ~np.isin(codepoints, _WHITESPACE_CODEPOINTS)
+    
+    # 공백으로 구분된 단어마다 번호를 매기고, 영문자로만 이루어진 단어를 영어 단어로 집계
+    word_starts = in_word & ~np.concatenate(([False], in_word[:-1]))
+    word_ids = np.cumsum(word_starts)[in_word] - 1
+    word_lengths = np.bincount(word_ids)
+    alpha_counts = np.bincount(word_ids, weights=is_alpha[in_word], minlength=word_lengths.size)
+    english_mask = alpha_counts == word_lengths
+    english_words = int(english_mask.sum())
+    english_chars = int(word_lengths[english_mask].sum())
+    
+    other_chars = codepoints.size - korean_chars - english_chars
+    return int(korean_chars * 1.5 + english_words * 1.3 + other_chars * 0.5)